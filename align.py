@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from fetcher import assemble
+from strategy import ffill
+
+
+def _wrap(values, like):
+    return pd.DataFrame(values, index=like.index, columns=like.columns)
+
+
+def valid_range(close):
+    valid = close.notna().to_numpy()
+    has = valid.any(axis=0)
+    first = np.where(has, valid.argmax(axis=0), -1)
+    last = np.where(has, len(valid) - 1 - valid[::-1].argmax(axis=0), -1)
+    dates = lambda pos: pd.Series([close.index[p] if p >= 0 else pd.NaT for p in pos], index=close.columns)
+    return dates(first), dates(last)
+
+
+def align_panel(frames, symbols):
+    # 一次concat拼出并集日期面板，不做全局dropna：每只股票的有效区间由掩码和首末日期记录
+    panel = assemble(frames, symbols)
+    close = panel['close'].dropna(how='all')
+    panel = {key: frame.reindex(close.index) for key, frame in panel.items()}
+    panel['valid'] = close.notna()
+    panel['first'], panel['last'] = valid_range(close)
+    return panel
+
+
+def fill_within(close):
+    # 只在每只股票自己的区间内前向填充，上市前和最后一根K线之后保持NaN
+    values = close.to_numpy(dtype='float64')
+    valid = ~np.isnan(values)
+    after_last = np.flip(np.logical_or.accumulate(valid[::-1], axis=0), axis=0)
+    return _wrap(np.where(after_last, ffill(values), np.nan), close)
+
+
+def aligned_returns(close):
+    filled = fill_within(close).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = filled[1:] / filled[:-1] - 1
+    ret[np.isnan(close.to_numpy()[1:])] = np.nan
+    return pd.DataFrame(ret, index=close.index[1:], columns=close.columns)
+
+
+def equity_curve(close):
+    filled = fill_within(close)
+    values = filled.to_numpy()
+    first = values[np.maximum(np.isfinite(values).argmax(axis=0), 0), np.arange(values.shape[1])]
+    return _wrap(values / first, close)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from align import align_panel, aligned_returns, equity_curve
+from metrics import TRADING_DAYS, compute_metrics, drawdown
+from correlation import corr_matrix, rolling_corr
+from rolling import rolling_metrics
+from simulation import simulate
+from portfolio import PortfolioModel, portfolio_returns, rebalance
+from strategy import DEFAULT_COST_BPS, run_strategy
+from profiler import NULL_PROFILER
+
+ROLL_WINDOW = 60
+SIM_PATHS = 10000
+PORTFOLIO = '等权组合'
+OPTIMAL = '最大夏普组合'
+FRONTIER_POINTS = 50
+CANDIDATES = 3000
+
+
+def analyze(frames, tickers, bench, strategy='买入持有', cost_bps=DEFAULT_COST_BPS, profiler=NULL_PROFILER,
+            simulation=False, workers=1, optimize=False):
+    all_tickers = list(dict.fromkeys(tickers + [bench]))
+    with profiler.span('对齐'):
+        panel = align_panel(frames, all_tickers)
+        close_data, high_data = panel['close'], panel['high']
+        low_data, volume_data = panel['low'], panel['volume']
+    stock_cols = [t for t in tickers if t in close_data.columns]
+    has_bench = bench in close_data.columns
+    with profiler.span('收益率'):
+        daily_returns = aligned_returns(close_data)
+        equity = equity_curve(close_data[stock_cols])
+        if strategy != '买入持有':
+            result = run_strategy(close_data[stock_cols], strategy, cost_bps)
+            daily_returns[stock_cols] = result['returns']
+            equity = result['equity']
+        cum_ret = (1 + daily_returns).cumprod() - 1
+    bench_ret = daily_returns[bench] if has_bench else None
+    with profiler.span('滚动指标'):
+        roll_vol = daily_returns[stock_cols].rolling(window=30).std() * np.sqrt(TRADING_DAYS)
+        roll_corr = rolling_corr(daily_returns[stock_cols], bench_ret, ROLL_WINDOW) if has_bench else None
+        rolling = rolling_metrics(daily_returns[stock_cols], equity.iloc[1:], bench_ret, ROLL_WINDOW)
+    with profiler.span('相关矩阵'):
+        corr = corr_matrix(daily_returns[stock_cols])
+    with profiler.span('指标'):
+        drawdowns = drawdown(equity)
+        stats = compute_metrics(daily_returns[stock_cols], bench_ret).to_dict('index')
+    frontier = candidates = None
+    portfolios = []
+    sim_input = daily_returns[stock_cols]
+    if len(stock_cols) > 1:
+        # 等权组合每日再平衡，只需一次矩阵乘法，始终计算
+        sim_input = sim_input.assign(**{PORTFOLIO: portfolio_returns(sim_input, np.ones(len(stock_cols)))[0]})
+        portfolios.append(PORTFOLIO)
+    model = PortfolioModel(daily_returns[stock_cols]) if optimize else None
+    if model is not None and len(model.assets) > 1:
+        with profiler.span('组合'):
+            # 有效前沿和随机组合按需计算；最大夏普组合取前沿上夏普最高点的权重，按月再平衡并扣除费用
+            frontier = model.frontier(FRONTIER_POINTS)
+            candidates = model.evaluate(model.random_weights(CANDIDATES))
+            best = frontier.loc[frontier['sharpe'].idxmax(), model.assets].to_numpy(dtype='float64')
+            weights = pd.Series(0.0, index=stock_cols)
+            weights[model.assets] = best
+            sim_input = sim_input.assign(**{
+                OPTIMAL: rebalance(daily_returns[stock_cols], weights.to_numpy(), 'M', cost_bps)['returns'][0],
+            })
+            portfolios.append(OPTIMAL)
+    for name in portfolios:
+        stats[name] = compute_metrics(sim_input[[name]], bench_ret).iloc[0].to_dict()
+    sim = None
+    if simulation:
+        # 风险模拟耗时随股票数线性增长，只在调用方需要时计算，并按股票分块用多进程
+        with profiler.span('风险模拟', paths=SIM_PATHS, workers=workers):
+            sim = simulate(sim_input, n_paths=SIM_PATHS, workers=workers)
+
+    return {
+        'close': close_data, 'high': high_data, 'low': low_data,
+        'volume': volume_data, 'daily_returns': daily_returns,
+        'cum_ret': cum_ret, 'roll_vol': roll_vol, 'corr': corr,
+        'roll_corr': roll_corr, 'roll_window': ROLL_WINDOW, 'rolling': rolling,
+        'drawdowns': drawdowns, 'stats': stats, 'sim': sim,
+        'portfolios': portfolios, 'frontier': frontier, 'candidates': candidates,
+        'stock_cols': stock_cols, 'bench': bench,
+        'has_bench': has_bench, 'strategy': strategy,
+        'valid': panel['valid'], 'first': panel['first'], 'last': panel['last']
+    }
@@ -1,168 +1,155 @@
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-from matplotlib.font_manager import FontProperties
 import pandas as pd
-import numpy as np
 import os
-import seaborn as sns
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from price_store import PriceStore, DEFAULT_ROOT
+from metrics import compute_metrics
+from report import write_report, fingerprint
+from strategy import STRATEGIES, STRATEGY_ALIASES, run_strategy, parse_params
+from profiler import Profiler
 
 save_dir = os.path.dirname(os.path.abspath(__file__))
-font = FontProperties(fname='/System/Library/Fonts/Supplemental/Songti.ttc')
-tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"]
-
-close_data = pd.DataFrame()
-volume_data = pd.DataFrame()
-for t in tickers:
-    df = pd.read_csv(os.path.join(save_dir, f"{t}.csv"), header=[0, 1], index_col=0, parse_dates=True).dropna()
-    close_data[t] = df[('Close', t)]
-    volume_data[t] = df[('Volume', t)]
-
-daily_returns = close_data.pct_change().dropna()
-cumulative_returns = (1 + daily_returns).cumprod() - 1
-rolling_vol = daily_returns.rolling(window=30).std() * np.sqrt(252)
-
-drawdowns = pd.DataFrame()
-for t in tickers:
-    peak = close_data[t].cummax()
-    drawdowns[t] = (close_data[t] - peak) / peak
-
-trading_days = len(daily_returns)
-annual_returns = (close_data.iloc[-1] / close_data.iloc[0]) ** (252 / trading_days) - 1
-annual_vol = daily_returns.std() * np.sqrt(252)
-sharpe = annual_returns / annual_vol
-corr = daily_returns.corr()
-
-txt = []
-
-def save_fig(fig, num, name):
-    fig.savefig(os.path.join(save_dir, f"图{num}_{name}.png"), dpi=150, bbox_inches='tight')
-    plt.close(fig)
-
-fig, ax = plt.subplots(figsize=(12, 6))
-for t in tickers:
-    ax.plot(close_data.index, close_data[t], label=t)
-ax.set_title('收盘价走势', fontproperties=font, fontsize=14)
-ax.set_xlabel('日期', fontproperties=font)
-ax.set_ylabel('价格 (USD)', fontproperties=font)
-ax.legend()
-ax.grid(True, alpha=0.3)
-save_fig(fig, 1, '收盘价走势')
-txt.append("=" * 60)
-txt.append("图1_收盘价走势")
-txt.append("=" * 60)
-for t in tickers:
-    txt.append(f"{t}: 起始价={close_data[t].iloc[0]:.2f}, 最终价={close_data[t].iloc[-1]:.2f}, 最高价={close_data[t].max():.2f}, 最低价={close_data[t].min():.2f}")
-
-fig, ax = plt.subplots(figsize=(12, 6))
-for t in tickers:
-    ax.plot(cumulative_returns.index, cumulative_returns[t] * 100, label=t)
-ax.set_title('累计收益率', fontproperties=font, fontsize=14)
-ax.set_xlabel('日期', fontproperties=font)
-ax.set_ylabel('累计收益率 (%)', fontproperties=font)
-ax.legend()
-ax.grid(True, alpha=0.3)
-save_fig(fig, 2, '累计收益率')
-txt.append("")
-txt.append("=" * 60)
-txt.append("图2_累计收益率")
-txt.append("=" * 60)
-for t in tickers:
-    txt.append(f"{t}: 最终={cumulative_returns[t].iloc[-1]*100:.2f}%, 最高={cumulative_returns[t].max()*100:.2f}%, 最低={cumulative_returns[t].min()*100:.2f}%")
-
-fig, axes = plt.subplots(2, 3, figsize=(15, 10))
-axes = axes.flatten()
-for i, t in enumerate(tickers):
-    axes[i].hist(daily_returns[t], bins=50, alpha=0.7, edgecolor='black')
-    axes[i].set_title(f'{t}', fontsize=11)
-    axes[i].set_xlabel('收益率', fontproperties=font)
-    axes[i].set_ylabel('频次', fontproperties=font)
-axes[-1].set_visible(False)
-fig.suptitle('每日收益率分布', fontproperties=font, fontsize=14)
-fig.tight_layout()
-save_fig(fig, 3, '每日收益率分布')
-txt.append("")
-txt.append("=" * 60)
-txt.append("图3_每日收益率分布")
-txt.append("=" * 60)
-for t in tickers:
-    txt.append(f"{t}: 均值={daily_returns[t].mean()*100:.4f}%, 标准差={daily_returns[t].std()*100:.4f}%, 偏度={daily_returns[t].skew():.4f}, 峰度={daily_returns[t].kurtosis():.4f}")
-
-fig, ax = plt.subplots(figsize=(12, 6))
-for t in tickers:
-    ax.plot(rolling_vol.index, rolling_vol[t] * 100, label=t)
-ax.set_title('30日滚动年化波动率', fontproperties=font, fontsize=14)
-ax.set_xlabel('日期', fontproperties=font)
-ax.set_ylabel('波动率 (%)', fontproperties=font)
-ax.legend()
-ax.grid(True, alpha=0.3)
-save_fig(fig, 4, '滚动波动率')
-txt.append("")
-txt.append("=" * 60)
-txt.append("图4_30日滚动年化波动率")
-txt.append("=" * 60)
-for t in tickers:
-    rv = rolling_vol[t].dropna()
-    txt.append(f"{t}: 均值={rv.mean()*100:.2f}%, 最高={rv.max()*100:.2f}%, 最低={rv.min()*100:.2f}%")
-
-fig, ax = plt.subplots(figsize=(8, 6))
-sns.heatmap(corr, annot=True, fmt='.3f', cmap='RdYlGn', ax=ax, vmin=-1, vmax=1)
-ax.set_title('收益率相关性热力图', fontproperties=font, fontsize=14)
-fig.tight_layout()
-save_fig(fig, 5, '相关性热力图')
-txt.append("")
-txt.append("=" * 60)
-txt.append("图5_收益率相关性热力图")
-txt.append("=" * 60)
-for i in range(len(tickers)):
-    for j in range(i + 1, len(tickers)):
-        txt.append(f"{tickers[i]}-{tickers[j]}: {corr.iloc[i, j]:.4f}")
-
-fig, ax = plt.subplots(figsize=(12, 6))
-for t in tickers:
-    ax.plot(drawdowns.index, drawdowns[t] * 100, label=t)
-ax.set_title('最大回撤', fontproperties=font, fontsize=14)
-ax.set_xlabel('日期', fontproperties=font)
-ax.set_ylabel('回撤 (%)', fontproperties=font)
-ax.legend()
-ax.grid(True, alpha=0.3)
-save_fig(fig, 6, '最大回撤')
-txt.append("")
-txt.append("=" * 60)
-txt.append("图6_最大回撤")
-txt.append("=" * 60)
-for t in tickers:
-    txt.append(f"{t}: 最大回撤={drawdowns[t].min()*100:.2f}%, 日期={drawdowns[t].idxmin().strftime('%Y-%m-%d')}")
-
-fig, ax = plt.subplots(figsize=(10, 7))
-for t in tickers:
-    ax.scatter(annual_vol[t] * 100, annual_returns[t] * 100, s=100, zorder=5)
-    ax.annotate(t, (annual_vol[t] * 100, annual_returns[t] * 100), fontsize=12, ha='left', va='bottom')
-ax.set_title('风险收益散点图', fontproperties=font, fontsize=14)
-ax.set_xlabel('年化波动率 (%)', fontproperties=font)
-ax.set_ylabel('年化收益率 (%)', fontproperties=font)
-ax.grid(True, alpha=0.3)
-save_fig(fig, 7, '风险收益散点图')
-txt.append("")
-txt.append("=" * 60)
-txt.append("图7_风险收益散点图")
-txt.append("=" * 60)
-for t in tickers:
-    txt.append(f"{t}: 年化收益率={annual_returns[t]*100:.2f}%, 年化波动率={annual_vol[t]*100:.2f}%, 夏普比率={sharpe[t]:.4f}")
-
-txt.append("")
-txt.append("=" * 60)
-txt.append("回测汇总")
-txt.append("=" * 60)
-txt.append(f"回测区间: {close_data.index[0].strftime('%Y-%m-%d')} ~ {close_data.index[-1].strftime('%Y-%m-%d')}")
-txt.append(f"交易日数: {trading_days}")
-for t in tickers:
-    txt.append(f"\n{t}:")
-    txt.append(f"  总收益率: {(close_data[t].iloc[-1]/close_data[t].iloc[0]-1)*100:.2f}%")
-    txt.append(f"  年化收益率: {annual_returns[t]*100:.2f}%")
-    txt.append(f"  年化波动率: {annual_vol[t]*100:.2f}%")
-    txt.append(f"  夏普比率: {sharpe[t]:.4f}")
-    txt.append(f"  最大回撤: {drawdowns[t].min()*100:.2f}%")
-
-with open(os.path.join(save_dir, '图表详情汇总.txt'), 'w', encoding='utf-8') as f:
-    f.write('\n'.join(txt))
+DEFAULT_TICKERS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"]
+# 单只股票结果的计算口径变化时递增，使旧的 symbols/*.json 缓存失效
+ROW_VERSION = 2
+
+
+def load_universe(path):
+    with open(path, encoding='utf-8') as f:
+        symbols = [t.strip().upper() for line in f for t in line.split('#')[0].replace('，', ',').split(',')]
+    return list(dict.fromkeys(t for t in symbols if t))
+
+
+def import_missing_csv(store, tickers, csv_dir):
+    for t in tickers:
+        csv_path = os.path.join(csv_dir, f"{t}.csv")
+        if not store.has(t) and os.path.exists(csv_path):
+            store.import_csv(csv_path, t)
+
+
+def _load_row(path, key):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            row = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return row if row.pop('key', None) == key else None
+
+
+def run_shard(store_root, shard, start, end, out_dir, bench=None,
+              strategy='buy_hold', params=None, cost_bps=0.0, force=False):
+    store = PriceStore(store_root)
+    sym_dir = os.path.join(out_dir, 'symbols')
+    close = store.read_panel(shard, 'Close', start, end).dropna(how='all')
+    counts = close.notna().sum()
+    close = close[counts.index[counts >= 3]]
+    if close.empty:
+        return []
+    bench_close = None
+    if bench and store.has(bench):
+        bench_close = store.read(bench, ['Close'], start, end)['Close'].dropna()
+    first, last = close.apply(pd.Series.first_valid_index), close.apply(pd.Series.last_valid_index)
+
+    # 每只股票按 自身有效区间内的收盘价+基准+策略参数 取指纹，未变化的直接复用上次的结果
+    bench_key = fingerprint(bench_close) if bench_close is not None else None
+    keys = {t: fingerprint(close[t].loc[first[t]:last[t]], bench_key, strategy, params or {}, cost_bps,
+                           ROW_VERSION)
+            for t in close.columns}
+    rows = {}
+    if not force:
+        for t in close.columns:
+            row = _load_row(os.path.join(sym_dir, f"{t}.json"), keys[t])
+            if row is not None:
+                rows[t] = row
+    stale = [t for t in close.columns if t not in rows]
+    if stale:
+        # 整个分片一次向量化计算，每只股票只在自己的有效区间内统计
+        ret = run_strategy(close[stale], strategy, cost_bps, **(params or {}))['returns']
+        # 收益类指标用股票自身的全部收益率，Beta/Alpha 由 compute_metrics 只在与基准成对的日期上计算
+        b = bench_close.pct_change().reindex(ret.index) if bench_close is not None else None
+        metrics = compute_metrics(ret, b)
+        for t, m in metrics.iterrows():
+            row = {k: v if isinstance(v, str) else float(v) for k, v in m.items()}
+            row.update(symbol=t, start=first[t].strftime('%Y-%m-%d'),
+                       end=last[t].strftime('%Y-%m-%d'), trading_days=int(counts[t]) - 1)
+            with open(os.path.join(sym_dir, f"{t}.json"), 'w', encoding='utf-8') as f:
+                json.dump(dict(row, key=keys[t]), f, ensure_ascii=False)
+            rows[t] = row
+    return [rows[t] for t in close.columns]
+
+
+def run_batch(tickers, store_root, start, end, out_dir, workers, bench=None,
+              strategy='buy_hold', params=None, cost_bps=0.0, force=False):
+    os.makedirs(os.path.join(out_dir, 'symbols'), exist_ok=True)
+    n_shards = min(len(tickers), max(workers * 4, 1))
+    shards = [tickers[i::n_shards] for i in range(n_shards)]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, store_root, s, start, end, out_dir, bench,
+                               strategy, params, cost_bps, force) for s in shards]
+        for i, fut in enumerate(futures):
+            rows.extend(fut.result())
+            print(f"分片 {i + 1}/{n_shards} 完成")
+    if not rows:
+        return pd.DataFrame()
+    result = pd.DataFrame(rows).set_index('symbol').sort_values('sharpe', ascending=False)
+    result.to_csv(os.path.join(out_dir, 'metrics.csv'))
+    result.to_parquet(os.path.join(out_dir, 'metrics.parquet'))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量策略回测')
+    parser.add_argument('--universe', help='股票列表文件，每行或逗号分隔一个代码，# 开头为注释')
+    parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    parser.add_argument('--end', help='结束日期 YYYY-MM-DD (不含)')
+    parser.add_argument('--out', default=save_dir, help='输出目录')
+    parser.add_argument('--bench', help='计算Beta/Alpha的基准代码，如 SPY')
+    parser.add_argument('--strategy', default='buy_hold', choices=list(STRATEGY_ALIASES) + list(STRATEGIES),
+                        help='交易策略')
+    parser.add_argument('--param', action='append', help='策略参数，如 --param short=10 --param long=50')
+    parser.add_argument('--cost-bps', type=float, default=0.0, help='单边交易费率 (bp)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数')
+    parser.add_argument('--store', default=DEFAULT_ROOT, help='本地价格库目录')
+    parser.add_argument('--csv-dir', default=save_dir, help='价格库缺失时导入CSV的目录')
+    parser.add_argument('--no-charts', action='store_true', help='只计算指标，不生成图表和汇总文本')
+    parser.add_argument('--font', help='中文字体文件路径')
+    parser.add_argument('--format', default='png', choices=['png', 'svg', 'pdf', 'jpg'], help='图表格式')
+    parser.add_argument('--dpi', type=int, default=150, help='图表DPI')
+    parser.add_argument('--render-workers', type=int, default=min(os.cpu_count() or 1, 7), help='图表渲染进程数')
+    parser.add_argument('--force', action='store_true', help='忽略指纹缓存，重新计算全部股票并重新生成报告')
+    parser.add_argument('--profile', help='写出各阶段耗时 (Chrome trace JSON)')
+    parser.add_argument('--profile-memory', action='store_true', help='同时用tracemalloc记录各阶段峰值内存（明显变慢）')
+    args = parser.parse_args(argv)
+
+    profiler = Profiler(enabled=bool(args.profile), memory=args.profile_memory)
+    tickers = load_universe(args.universe) if args.universe else DEFAULT_TICKERS
+    os.makedirs(args.out, exist_ok=True)
+    store = PriceStore(args.store)
+    with profiler.span('导入CSV'):
+        import_missing_csv(store, tickers + ([args.bench] if args.bench else []), args.csv_dir)
+
+    params = parse_params(args.param)
+    with profiler.span('批量回测', workers=args.workers, tickers=len(tickers)):
+        result = run_batch(tickers, args.store, args.start, args.end, args.out, args.workers, args.bench,
+                           args.strategy, params, args.cost_bps, args.force)
+    missing = [t for t in tickers if t not in result.index]
+    print(f"完成 {len(result)} 只股票" + (f", 缺失: {', '.join(missing)}" if missing else ''))
+    if not args.no_charts and not result.empty:
+        chart_tickers = [t for t in tickers if t in result.index]
+        with profiler.span('读取面板'):
+            close_data = store.read_panel(chart_tickers, 'Close', args.start, args.end).dropna(how='all')
+        with profiler.span('生成报告'):
+            write_report(close_data, args.out, args.format, args.dpi, args.font, args.render_workers,
+                         args.strategy, params, args.cost_bps, profiler, args.force)
+    if args.profile:
+        profiler.close()
+        profiler.write(args.profile)
+        print(f"性能: {profiler.summary()}")
+
+
+if __name__ == '__main__':
+    main()
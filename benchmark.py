@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import warnings
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from price_store import PriceStore
+from backtest import import_missing_csv
+from analysis import analyze
+from charts import CHART_TABS, RENDERERS
+
+TICKER_COUNTS = [10, 100, 1000, 5000]
+YEAR_SPANS = [1, 10, 20]
+BENCH = 'BENCH'
+END_DATE = '2024-12-31'
+
+
+def synthetic_ohlcv(n_tickers, years, seed=0, ipo_frac=0.2, gap_frac=0.01):
+    # 几何布朗运动生成收盘价，部分股票在区间中途上市，并随机剔除少量交易日模拟停牌/缺失
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=END_DATE, periods=int(years * 252), name='Date')
+    n = len(index)
+    frames = {}
+    for i, symbol in enumerate([BENCH] + [f'S{i:05d}' for i in range(n_tickers)]):
+        mu, sigma = rng.uniform(-0.05, 0.2), rng.uniform(0.1, 0.6)
+        ret = (mu - sigma ** 2 / 2) / 252 + sigma / np.sqrt(252) * rng.standard_normal(n)
+        close = rng.uniform(10, 500) * np.exp(np.cumsum(ret))
+        spread = np.abs(rng.standard_normal(n)) * sigma / np.sqrt(252) * close
+        open_ = close * (1 + rng.normal(0, 0.003, n))
+        df = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + spread,
+            'Low': np.minimum(open_, close) - spread,
+            'Close': close,
+            'Volume': rng.integers(1e5, 1e7, n).astype('float64'),
+        }, index=index)
+        keep = rng.random(n) >= gap_frac
+        if i > 0 and rng.random() < ipo_frac:
+            keep[:rng.integers(1, n // 2 + 1)] = False
+        frames[symbol] = df[keep]
+    return frames
+
+
+def write_csvs(frames, directory):
+    os.makedirs(directory, exist_ok=True)
+    for symbol, df in frames.items():
+        out = df.copy()
+        out.columns = pd.MultiIndex.from_product([out.columns, [symbol]], names=['Price', 'Ticker'])
+        out.to_csv(os.path.join(directory, f'{symbol}.csv'))
+
+
+def timed(fn, repeat=1):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - t0)
+    return result, runs
+
+
+def _record(results, n_tickers, years, stage, runs, **extra):
+    row = {'tickers': n_tickers, 'years': years, 'stage': stage,
+           'seconds': min(runs) if runs else None, 'runs': runs}
+    row.update(extra)
+    results.append(row)
+    if runs:
+        print(f"{n_tickers:>5}只 x {years:>2}年  {stage:<16} {min(runs):9.3f}s")
+    else:
+        reason = extra.get('error') or extra.get('skipped', '')
+        print(f"{n_tickers:>5}只 x {years:>2}年  {stage:<16}    跳过 ({reason})")
+
+
+def bench_case(n_tickers, years, workdir, repeat=1, render_max_tickers=100, seed=0, gap_frac=0.01):
+    results = []
+    frames = synthetic_ohlcv(n_tickers, years, seed, gap_frac=gap_frac)
+    tickers = [s for s in frames if s != BENCH]
+    csv_dir = os.path.join(workdir, 'csv')
+    write_csvs(frames, csv_dir)
+
+    def load():
+        store_root = os.path.join(workdir, 'store')
+        shutil.rmtree(store_root, ignore_errors=True)
+        store = PriceStore(store_root)
+        import_missing_csv(store, tickers + [BENCH], csv_dir)
+        return store.read_panel(tickers, 'Close')
+
+    _, runs = timed(load, repeat)
+    _record(results, n_tickers, years, 'csv_load', runs)
+
+    store = PriceStore(os.path.join(workdir, 'store'))
+    loaded = {s: store.read(s) for s in frames}
+    try:
+        d, runs = timed(lambda: analyze(loaded, tickers, BENCH), repeat)
+    except Exception as e:
+        # 某个规模下分析失败（如内存不足）时记录错误，不中断整轮基准
+        _record(results, n_tickers, years, 'stats', [], error=f'{type(e).__name__}: {e}')
+        return results
+    _record(results, n_tickers, years, 'stats', runs, rows=len(d['close']))
+
+    d['failed'] = []
+    for name in CHART_TABS:
+        stage = f'render:{name}'
+        if render_max_tickers and n_tickers > render_max_tickers:
+            _record(results, n_tickers, years, stage, [], skipped=f'>{render_max_tickers}只')
+            continue
+        runs = []
+        for _ in range(repeat):
+            fig = plt.Figure(figsize=(12, 5.5), dpi=100)
+            FigureCanvasAgg(fig)
+            t0 = time.perf_counter()
+            RENDERERS[name](fig, d)
+            fig.canvas.draw()
+            runs.append(time.perf_counter() - t0)
+            plt.close(fig)
+        _record(results, n_tickers, years, stage, runs)
+    return results
+
+
+def environment():
+    import matplotlib as mpl
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': mpl.__version__,
+    }
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['tickers'], r['years'], r['stage']): r['seconds'] for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        old = baseline.get((r['tickers'], r['years'], r['stage']))
+        if not old or r['seconds'] is None:
+            continue
+        ratio = r['seconds'] / old
+        if ratio > 1 + threshold:
+            regressions.append(r)
+            print(f"变慢 {r['tickers']}只 x {r['years']}年 {r['stage']}: {old:.3f}s -> {r['seconds']:.3f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='合成行情数据性能基准')
+    parser.add_argument('--tickers', type=_int_list, default=TICKER_COUNTS, help='股票数量，逗号分隔')
+    parser.add_argument('--years', type=_int_list, default=YEAR_SPANS, help='年数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=1, help='每项重复次数，取最小值')
+    parser.add_argument('--render-max-tickers', type=int, default=100,
+                        help='超过该股票数时跳过图表渲染，0表示不限制')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gap-frac', type=float, default=0.01, help='每只股票随机缺失的交易日比例')
+    parser.add_argument('--out', default='benchmark_results.json', help='结果JSON路径')
+    parser.add_argument('--baseline', help='与之前的结果JSON对比，报告变慢的项')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定变慢的相对阈值')
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    results = []
+    for n_tickers in args.tickers:
+        for years in args.years:
+            workdir = tempfile.mkdtemp(prefix='stock_bench_')
+            try:
+                results.extend(bench_case(n_tickers, years, workdir, args.repeat,
+                                          args.render_max_tickers, args.seed, args.gap_frac))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, ensure_ascii=False, indent=1)
+    print(f"结果已写入 {args.out}")
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import os
+import weakref
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.font_manager import FontProperties
+from metrics import TRADING_DAYS, annualize
+from downsample import LineDownsampler
+from correlation import plot_corr
+from portfolio import plot_frontier
+
+FONT_PATHS = ['/System/Library/Fonts/Supplemental/Songti.ttc',
+              'C:\\Windows\\Fonts\\simsun.ttc',
+              '/usr/share/fonts/opentype/noto/NotoSerifCJK-Regular.ttc',
+              '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc']
+
+
+def load_font(path=None):
+    for p in ([path] if path else FONT_PATHS):
+        if os.path.exists(p):
+            return FontProperties(fname=p)
+    return FontProperties()
+
+
+font = load_font()
+
+CHART_TABS = ['收盘价走势', '累计收益率', '最大回撤', '滚动波动率', '滚动相关性',
+              '滚动夏普', '滚动索提诺', '滚动Beta', '滚动Alpha', '滚动回撤', '收益率分布', '相关性热力图', '风险收益散点图', '均线与布林带', 'Beta与Alpha']
+
+_line_state = weakref.WeakKeyDictionary()
+
+
+def line_chart(fig, index, series, title, ylabel):
+    labels = [label for label, _, _ in series] + [title]
+    state = _line_state.get(fig)
+    if state is not None and state['labels'] == labels and fig.axes:
+        for line, (_, values, _) in zip(state['lines'], series):
+            state['sampler'].set_data(line, index, values)
+        ax = fig.axes[0]
+        ax.relim()
+        ax.autoscale_view()
+        return ax
+    fig.clear()
+    ax = fig.add_subplot(111)
+    sampler = LineDownsampler(ax)
+    lines = [sampler.plot(index, values, label=label, **style) for label, values, style in series]
+    ax.set_title(title, fontproperties=font, fontsize=14)
+    ax.set_xlabel('日期', fontproperties=font)
+    ax.set_ylabel(ylabel, fontproperties=font)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    _line_state[fig] = {'labels': labels, 'lines': lines, 'sampler': sampler}
+    return ax
+
+
+def _rebuild(fig):
+    _line_state.pop(fig, None)
+    fig.clear()
+
+
+def _bench_series(d, frame, scale=1):
+    if not d['has_bench']:
+        return []
+    return [(d['bench'], frame[d['bench']] * scale, dict(linestyle='--', color='gray', alpha=0.7))]
+
+
+def draw_close(fig, d):
+    close = d['close']
+    series = [(t, close[t], {}) for t in d['stock_cols']] + _bench_series(d, close)
+    line_chart(fig, close.index, series, '收盘价走势', '价格 (USD)')
+
+
+def draw_cum_ret(fig, d):
+    cum_ret = d['cum_ret']
+    series = [(t, cum_ret[t] * 100, {}) for t in d['stock_cols']] + _bench_series(d, cum_ret, 100)
+    line_chart(fig, cum_ret.index, series, '累计收益率', '累计收益率 (%)')
+
+
+def draw_drawdown(fig, d):
+    drawdowns = d['drawdowns']
+    series = [(t, drawdowns[t] * 100, {}) for t in d['stock_cols']]
+    line_chart(fig, drawdowns.index, series, '最大回撤', '回撤 (%)')
+
+
+def draw_roll_vol(fig, d):
+    roll_vol = d['roll_vol']
+    series = [(t, roll_vol[t] * 100, {}) for t in d['stock_cols']]
+    line_chart(fig, roll_vol.index, series, '30日滚动年化波动率', '波动率 (%)')
+
+
+def draw_roll_corr(fig, d):
+    if not d['has_bench']:
+        _rebuild(fig)
+        return
+    roll_corr = d['roll_corr']
+    series = [(t, roll_corr[t], {}) for t in d['stock_cols']]
+    line_chart(fig, roll_corr.index, series, f"{d['roll_window']}日滚动相关性 (vs {d['bench']})", '相关系数')
+
+
+def _rolling_chart(key, title, ylabel, scale=1):
+    def draw(fig, d):
+        frame = d['rolling'].get(key)
+        if frame is None:
+            _rebuild(fig)
+            return
+        series = [(t, frame[t] * scale, {}) for t in d['stock_cols']]
+        suffix = f" (vs {d['bench']})" if key in ('beta', 'alpha') else ''
+        line_chart(fig, frame.index, series, f"{d['roll_window']}日{title}{suffix}", ylabel)
+    return draw
+
+
+def draw_hist(fig, d):
+    _rebuild(fig)
+    stock_cols = d['stock_cols']
+    daily_returns = d['daily_returns']
+    n = len(stock_cols)
+    ncols = min(n, 3)
+    nrows = (n + ncols - 1) // ncols
+    for i, t in enumerate(stock_cols):
+        ax = fig.add_subplot(nrows, ncols, i + 1)
+        ret = daily_returns[t].dropna()
+        ax.hist(ret, bins=50, alpha=0.7, edgecolor='black', density=True)
+        x = np.linspace(ret.min(), ret.max(), 200)
+        ax.plot(x, (1 / (ret.std() * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((x - ret.mean()) / ret.std()) ** 2),
+                'r-', linewidth=1.5)
+        ax.set_title(f'{t}', fontsize=11)
+        ax.set_xlabel('收益率', fontproperties=font, fontsize=9)
+        ax.axvline(np.percentile(ret, 5), color='orange', linestyle='--', linewidth=1)
+    fig.suptitle('每日收益率分布 (橙线=VaR 95%)', fontproperties=font, fontsize=13)
+    fig.tight_layout()
+
+
+def draw_corr(fig, d):
+    _rebuild(fig)
+    ax = fig.add_subplot(111)
+    plot_corr(ax, d['corr'])
+    ax.set_title('收益率相关性热力图', fontproperties=font, fontsize=14)
+    fig.tight_layout()
+
+
+def draw_risk_return(fig, d):
+    _rebuild(fig)
+    stock_cols, stats = d['stock_cols'], d['stats']
+    close, daily_returns, bench = d['close'], d['daily_returns'], d['bench']
+    ax = fig.add_subplot(111)
+    colors = plt.cm.tab10(np.linspace(0, 1, len(stock_cols)))
+    for i, t in enumerate(stock_cols):
+        s = stats[t]
+        ax.scatter(s['ann_vol'] * 100, s['ann_ret'] * 100, s=120, color=colors[i], zorder=5)
+        ax.annotate(t, (s['ann_vol'] * 100, s['ann_ret'] * 100), fontsize=11,
+                    xytext=(8, 5), textcoords='offset points')
+    if d['has_bench']:
+        b_close = close[bench].dropna()
+        b_ret = (b_close.iloc[-1] / b_close.iloc[0] - 1)
+        b_ann = annualize(b_ret, daily_returns[bench].count())
+        b_vol = daily_returns[bench].std() * np.sqrt(TRADING_DAYS)
+        ax.scatter(b_vol * 100, b_ann * 100, s=120, marker='D', color='gray', zorder=5)
+        ax.annotate(bench, (b_vol * 100, b_ann * 100), fontsize=11,
+                    xytext=(8, 5), textcoords='offset points')
+    if d.get('frontier') is not None:
+        plot_frontier(ax, d['frontier'], d.get('candidates'), font)
+    ax.set_title('风险收益散点图', fontproperties=font, fontsize=14)
+    ax.set_xlabel('年化波动率 (%)', fontproperties=font)
+    ax.set_ylabel('年化收益率 (%)', fontproperties=font)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+
+def draw_bollinger(fig, d):
+    _rebuild(fig)
+    stock_cols, close = d['stock_cols'], d['close']
+    n = len(stock_cols)
+    ncols = min(n, 2)
+    nrows = (n + ncols - 1) // ncols
+    for i, t in enumerate(stock_cols):
+        ax = fig.add_subplot(nrows, ncols, i + 1)
+        c = close[t]
+        ma20 = c.rolling(20).mean()
+        ma60 = c.rolling(60).mean()
+        std20 = c.rolling(20).std()
+        upper = ma20 + 2 * std20
+        lower = ma20 - 2 * std20
+        sampler = LineDownsampler(ax)
+        sampler.plot(c.index, c, label='Close', linewidth=0.8)
+        sampler.plot(c.index, ma20, label='MA20', linewidth=0.8)
+        sampler.plot(c.index, ma60, label='MA60', linewidth=0.8)
+        ax.fill_between(c.index, upper, lower, alpha=0.15, color='blue')
+        ax.set_title(f'{t}', fontsize=11)
+        ax.legend(fontsize=7)
+        ax.grid(True, alpha=0.3)
+    fig.suptitle('均线与布林带 (MA20/MA60/BB20)', fontproperties=font, fontsize=13)
+    fig.tight_layout()
+
+
+def draw_beta_alpha(fig, d):
+    _rebuild(fig)
+    stock_cols, stats, bench = d['stock_cols'], d['stats'], d['bench']
+    if d['has_bench'] and len(stock_cols) > 0:
+        ax1 = fig.add_subplot(121)
+        betas = [stats[t]['beta'] for t in stock_cols]
+        bars1 = ax1.barh(stock_cols, betas, color=plt.cm.tab10(np.linspace(0, 1, len(stock_cols))))
+        ax1.axvline(1.0, color='red', linestyle='--', linewidth=1)
+        ax1.set_title('Beta (vs ' + bench + ')', fontproperties=font, fontsize=13)
+        ax1.set_xlabel('Beta', fontproperties=font)
+        for bar, val in zip(bars1, betas):
+            ax1.text(bar.get_width() + 0.02, bar.get_y() + bar.get_height() / 2,
+                     f'{val:.3f}', va='center', fontsize=10)
+        ax1.grid(True, alpha=0.3, axis='x')
+
+        ax2 = fig.add_subplot(122)
+        alphas = [stats[t]['alpha'] * 100 for t in stock_cols]
+        bars2 = ax2.barh(stock_cols, alphas, color=plt.cm.tab10(np.linspace(0, 1, len(stock_cols))))
+        ax2.axvline(0, color='red', linestyle='--', linewidth=1)
+        ax2.set_title('Alpha (vs ' + bench + ')', fontproperties=font, fontsize=13)
+        ax2.set_xlabel('Alpha (%)', fontproperties=font)
+        for bar, val in zip(bars2, alphas):
+            ax2.text(bar.get_width() + 0.2, bar.get_y() + bar.get_height() / 2,
+                     f'{val:.2f}%', va='center', fontsize=10)
+        ax2.grid(True, alpha=0.3, axis='x')
+    fig.tight_layout()
+
+
+RENDERERS = {
+    '收盘价走势': draw_close,
+    '累计收益率': draw_cum_ret,
+    '最大回撤': draw_drawdown,
+    '滚动波动率': draw_roll_vol,
+    '滚动相关性': draw_roll_corr,
+    '滚动夏普': _rolling_chart('sharpe', '滚动夏普比率', '夏普比率'),
+    '滚动索提诺': _rolling_chart('sortino', '滚动索提诺比率', '索提诺比率'),
+    '滚动Beta': _rolling_chart('beta', '滚动Beta', 'Beta'),
+    '滚动Alpha': _rolling_chart('alpha', '滚动年化Alpha', 'Alpha (%)', 100),
+    '滚动回撤': _rolling_chart('drawdown', '滚动回撤', '回撤 (%)', 100),
+    '收益率分布': draw_hist,
+    '相关性热力图': draw_corr,
+    '风险收益散点图': draw_risk_return,
+    '均线与布林带': draw_bollinger,
+    'Beta与Alpha': draw_beta_alpha,
+}
@@ -0,0 +1,116 @@
+import warnings
+import numpy as np
+import pandas as pd
+from rolling import window_sum
+
+ANNOT_LIMIT = 30
+LABEL_LIMIT = 100
+
+
+def _standardize(values, dtype):
+    x = np.asarray(values, dtype=dtype)
+    mean = np.nanmean(x, axis=0)
+    std = np.nanstd(x, axis=0, ddof=1)
+    z = (x - mean) / np.where(std > 0, std, np.nan)
+    return np.nan_to_num(z, copy=False), np.isfinite(std) & (std > 0)
+
+
+def _pairwise_corr(x, block, dtype, min_periods):
+    # 上市时间不同的股票按两两重叠区间计算，与 DataFrame.corr 的成对剔除一致
+    valid = ~np.isnan(x)
+    v = valid.astype(dtype)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        x = np.where(valid, x - np.nanmean(x, axis=0), 0).astype(dtype)
+    x2 = x * x
+    k = x.shape[1]
+    out = np.empty((k, k), dtype=dtype)
+    for i in range(0, k, block):
+        sl = slice(i, i + block)
+        n = v[:, sl].T @ v
+        sx = x[:, sl].T @ v
+        sy = v[:, sl].T @ x
+        sxx = x2[:, sl].T @ v
+        syy = v[:, sl].T @ x2
+        sxy = x[:, sl].T @ x
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+        c[n < min_periods] = np.nan
+        out[sl] = c
+    return out
+
+
+def corr_matrix(returns, block=1024, dtype=np.float32, min_periods=3):
+    x = np.asarray(returns, dtype=dtype)
+    if np.isnan(x).any():
+        out = _pairwise_corr(x, block, dtype, min_periods)
+        valid = np.isfinite(np.diagonal(out)) & (np.sum(~np.isnan(x), axis=0) >= min_periods)
+    else:
+        z, valid = _standardize(x, dtype)
+        n, k = z.shape
+        out = np.empty((k, k), dtype=dtype)
+        for i in range(0, k, block):
+            out[i:i + block] = z[:, i:i + block].T @ z
+        out /= n - 1
+    np.clip(out, -1, 1, out=out)
+    out[~valid] = np.nan
+    out[:, ~valid] = np.nan
+    np.fill_diagonal(out, np.where(valid, 1, np.nan))
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(out, index=returns.columns, columns=returns.columns)
+    return out
+
+
+def cluster_order(corr):
+    c = np.nan_to_num(np.asarray(corr, dtype='float64'))
+    if len(c) < 3:
+        return np.arange(len(c))
+    try:
+        from scipy.cluster.hierarchy import linkage, leaves_list
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        return np.arange(len(c))
+    dist = np.sqrt(np.clip(0.5 * (1 - c), 0, 1))
+    np.fill_diagonal(dist, 0)
+    return leaves_list(linkage(squareform(dist, checks=False), method='average'))
+
+
+def plot_corr(ax, corr, cluster=None):
+    n = len(corr)
+    if n <= ANNOT_LIMIT and not cluster:
+        import seaborn as sns
+        sns.heatmap(corr, annot=True, fmt='.3f', cmap='RdYlGn', ax=ax, vmin=-1, vmax=1)
+        return
+    order = cluster_order(corr)
+    corr = corr.iloc[order, order] if isinstance(corr, pd.DataFrame) else corr[np.ix_(order, order)]
+    im = ax.imshow(np.asarray(corr, dtype='float32'), cmap='RdYlGn', vmin=-1, vmax=1,
+                   interpolation='nearest', aspect='auto')
+    ax.figure.colorbar(im, ax=ax)
+    if n <= LABEL_LIMIT and isinstance(corr, pd.DataFrame):
+        ax.set_xticks(range(n))
+        ax.set_xticklabels(corr.columns, rotation=90, fontsize=7)
+        ax.set_yticks(range(n))
+        ax.set_yticklabels(corr.index, fontsize=7)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+
+def rolling_corr(returns, bench, window):
+    x = np.asarray(returns, dtype='float64')
+    if x.ndim == 1:
+        x = x[:, None]
+    y = np.asarray(bench, dtype='float64').reshape(-1, 1)
+
+    sx, sy = window_sum(x, window), window_sum(y, window)
+    sxy, sxx, syy = window_sum(x * y, window), window_sum(x * x, window), window_sum(y * y, window)
+    cov = sxy - sx * sy / window
+    var_x = sxx - sx * sx / window
+    var_y = syy - sy * sy / window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(out, index=returns.index, columns=returns.columns)
+    if isinstance(returns, pd.Series):
+        return pd.Series(out[:, 0], index=returns.index, name=returns.name)
+    return out
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+import pandas as pd
+from price_store import PriceStore, FIELDS, normalize
+
+
+def covered_end(end):
+    # 当日K线可能尚未收盘，覆盖区间最多记到今天
+    return min(pd.Timestamp(end), pd.Timestamp.today().normalize())
+
+
+class YahooProvider:
+    def download(self, symbol, start, end):
+        import yfinance as yf
+        df = yf.download(symbol, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'), progress=False)
+        return normalize(df, symbol) if not df.empty else pd.DataFrame(columns=FIELDS)
+
+
+class FrameProvider:
+    def __init__(self, frames, latency=0.0):
+        self.frames = {s: normalize(df, s) for s, df in frames.items()}
+        self.latency = latency
+        self.calls = []
+
+    def download(self, symbol, start, end):
+        self.calls.append((symbol, start, end))
+        if self.latency:
+            time.sleep(self.latency)
+        df = self.frames.get(symbol)
+        if df is None:
+            return pd.DataFrame(columns=FIELDS)
+        return df[(df.index >= start) & (df.index < end)]
+
+
+class PriceCache:
+    def __init__(self, store=None, provider=None, max_bytes=2 * 1024 ** 3):
+        self.store = store or PriceStore()
+        self.provider = provider or YahooProvider()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(self.store.root, '_coverage.json')
+        self.coverage = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding='utf-8') as f:
+                self.coverage = json.load(f)
+
+    def _save(self):
+        tmp = self._manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.coverage, f)
+        os.replace(tmp, self._manifest_path)
+
+    def gaps(self, symbol, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        entry = self.coverage.get(symbol)
+        if entry is None or not self.store.has(symbol):
+            return [(start, end)]
+        cov_start, cov_end = pd.Timestamp(entry['start']), pd.Timestamp(entry['end'])
+        gaps = []
+        # 缺口始终延伸到已覆盖区间边界，保证每只股票的覆盖区间连续
+        if start < cov_start:
+            gaps.append((start, cov_start))
+        if end > cov_end:
+            gaps.append((cov_end, end))
+        return gaps
+
+    def get(self, symbol, start, end, columns=None):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        parts = [self.provider.download(symbol, s, e) for s, e in self.gaps(symbol, start, end)]
+        parts = [p for p in parts if not p.empty]
+        with self._lock:
+            if parts:
+                self.store.merge(symbol, pd.concat(parts))
+            if not self.store.has(symbol):
+                return pd.DataFrame(columns=columns or FIELDS)
+            entry = self.coverage.get(symbol)
+            if parts:
+                # 覆盖区间只延伸到实际返回的K线，下载失败或返回为空的缺口下次请求时仍会重下
+                first = min(p.index.min() for p in parts)
+                last = min(max(p.index.max() for p in parts) + pd.Timedelta(days=1), covered_end(end))
+                if entry is not None:
+                    first = min(first, pd.Timestamp(entry['start']))
+                    last = max(last, pd.Timestamp(entry['end']))
+                entry = dict(entry or {}, start=first.isoformat(), end=last.isoformat())
+            elif entry is None:
+                entry = {'start': start.isoformat(), 'end': start.isoformat()}
+            entry['last_access'] = time.time()
+            entry['bytes'] = os.path.getsize(self.store.path(symbol))
+            self.coverage[symbol] = entry
+            self.evict(protect={symbol})
+            self._save()
+        return self.store.read(symbol, columns, start, end)
+
+    def evict(self, protect=()):
+        total = sum(e['bytes'] for e in self.coverage.values())
+        for symbol in sorted(self.coverage, key=lambda s: self.coverage[s]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if symbol in protect:
+                continue
+            total -= self.coverage.pop(symbol)['bytes']
+            self.store.delete(symbol)
+
+
+class FrameMemo:
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def nbytes(self):
+        return sum(e['bytes'] for e in self.entries.values())
+
+    def get(self, symbol, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        with self._lock:
+            entry = self.entries.get(symbol)
+            if entry is None or start < entry['start'] or end > entry['end']:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(symbol)
+            self.hits += 1
+            df = entry['frame']
+        # 请求区间落在已缓存的超集内，直接切片返回，不再读盘或下载
+        return df[(df.index >= start) & (df.index < end)]
+
+    def put(self, symbol, start, end, df):
+        # 与 PriceCache 一致，只记录到今天为止的覆盖区间，之后的日期下次请求时仍会去取
+        start, end = pd.Timestamp(start), covered_end(end)
+        with self._lock:
+            entry = self.entries.pop(symbol, None)
+            if entry is not None and start <= entry['end'] and end >= entry['start']:
+                # 与已有区间重叠或相邻时合并成一个连续区间，否则用新区间替换
+                df = pd.concat([entry['frame'], df])
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+                start, end = min(start, entry['start']), max(end, entry['end'])
+            self.entries[symbol] = {'start': start, 'end': end, 'frame': df,
+                                    'bytes': int(df.memory_usage(deep=True).sum())}
+            total = self.nbytes()
+            while total > self.max_bytes and len(self.entries) > 1:
+                _, old = self.entries.popitem(last=False)
+                total -= old['bytes']
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
@@ -0,0 +1,91 @@
+import numpy as np
+import matplotlib.dates as mdates
+
+MIN_BUCKETS = 200
+
+
+def minmax_indices(y, n_buckets):
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    nan = np.isnan(blocks)
+    lo = np.where(nan, np.inf, blocks).argmin(axis=1)
+    hi = np.where(nan, -np.inf, blocks).argmax(axis=1)
+    offsets = np.arange(n_buckets) * size
+    idx = np.concatenate([[0, n - 1], offsets + lo, offsets + hi])
+    return np.unique(idx[idx < n])
+
+
+def lttb_indices(y, n_out, x=None):
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype='float64') if x is None else np.asarray(x, dtype='float64')
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, edges[i + 2] if i + 2 < len(edges) else n)
+        cx = x[nxt].mean()
+        cy = np.nanmean(y[nxt]) if not np.isnan(y[nxt]).all() else y[a]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo if np.isnan(area).all() else lo + int(np.nanargmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def _as_numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return mdates.date2num(x)
+    return x.astype('float64')
+
+
+class LineDownsampler:
+    def __init__(self, ax, max_buckets=None, method='minmax'):
+        self.ax = ax
+        self.max_buckets = max_buckets
+        self.method = method
+        self.series = {}
+        ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+    def _budget(self):
+        return self.max_buckets or max(int(self.ax.bbox.width), MIN_BUCKETS)
+
+    def _sample(self, series, lo=None, hi=None):
+        x_raw, x_num, y = series
+        i0 = 0 if lo is None else max(np.searchsorted(x_num, lo) - 1, 0)
+        i1 = len(y) if hi is None else min(np.searchsorted(x_num, hi) + 1, len(y))
+        budget = self._budget()
+        if self.method == 'lttb':
+            idx = lttb_indices(y[i0:i1], 2 * budget, x_num[i0:i1]) + i0
+        else:
+            idx = minmax_indices(y[i0:i1], budget) + i0
+        return x_raw[idx], y[idx]
+
+    def _series(self, x, y):
+        x_raw = np.asarray(x)
+        return x_raw, _as_numeric(x_raw), np.asarray(y, dtype='float64')
+
+    def plot(self, x, y, **kwargs):
+        series = self._series(x, y)
+        line = self.ax.plot(*self._sample(series), **kwargs)[0]
+        self.series[line] = series
+        return line
+
+    def set_data(self, line, x, y):
+        self.series[line] = self._series(x, y)
+        line.set_data(*self._sample(self.series[line]))
+
+    def _on_xlim_changed(self, ax):
+        lo, hi = ax.get_xlim()
+        for line in self.series:
+            line.set_data(*self._sample(self.series[line], lo, hi))
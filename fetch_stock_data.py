@@ -1,11 +1,12 @@
-import yfinance as yf
-import pandas as pd
 from datetime import datetime, timedelta
+from data_cache import PriceCache
+from fetcher import fetch_frames
 
 tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"]
 end = datetime.today()
 start = end - timedelta(days=3*365)
+cache = PriceCache()
 
-for t in tickers:
-    df = yf.download(t, start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"))
-    df.to_csv(f"{t}.csv")
+frames, failed = fetch_frames(cache, tickers, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+if failed:
+    print(f"获取失败: {', '.join(failed)}")
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+
+PANEL_FIELDS = {'close': 'Close', 'high': 'High', 'low': 'Low', 'volume': 'Volume'}
+
+
+def fetch_one(cache, symbol, start, end, retries=2, backoff=0.5, cancel=None):
+    for attempt in range(retries + 1):
+        if cancel is not None and cancel.is_set():
+            return pd.DataFrame()
+        try:
+            df = cache.get(symbol, start, end)
+            if not df.empty or attempt == retries:
+                return df
+        except Exception:
+            if attempt == retries:
+                raise
+        time.sleep(backoff * 2 ** attempt)
+
+
+def iter_frames(cache, symbols, start, end, max_workers=8, retries=2, backoff=0.5, cancel=None, poll=0.2):
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(fetch_one, cache, s, start, end, retries, backoff, cancel): s for s in symbols}
+        pending = set(futures)
+        while pending:
+            if cancel is not None and cancel.is_set():
+                return
+            done, pending = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    df = fut.result()
+                except Exception:
+                    df = None
+                yield futures[fut], df if df is not None and not df.empty else None
+    finally:
+        # 取消时不等待正在下载的请求，未开始的任务直接丢弃
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_frames(cache, symbols, start, end, max_workers=8, retries=2, backoff=0.5, cancel=None):
+    frames = {}
+    for symbol, df in iter_frames(cache, symbols, start, end, max_workers, retries, backoff, cancel):
+        if df is not None:
+            frames[symbol] = df
+    failed = [s for s in symbols if s not in frames]
+    return frames, failed
+
+
+def assemble(frames, symbols):
+    order = [s for s in symbols if s in frames]
+    if not order:
+        return {key: pd.DataFrame() for key in PANEL_FIELDS}
+    # 先求所有股票日期的并集，再按位置把每只股票的数据写入预分配的矩阵，避免逐列插入和反复对齐
+    index = pd.DatetimeIndex(np.unique(np.concatenate([frames[s].index.values for s in order])), name='Date')
+    panel = {key: np.full((len(index), len(order)), np.nan) for key in PANEL_FIELDS}
+    for j, s in enumerate(order):
+        df = frames[s]
+        pos = index.searchsorted(df.index)
+        for key, field in PANEL_FIELDS.items():
+            if field in df.columns:
+                panel[key][pos, j] = df[field].to_numpy(dtype='float64')
+    return {key: pd.DataFrame(values, index=index, columns=order) for key, values in panel.items()}
@@ -0,0 +1,230 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Day, BDay
+from metrics import TRADING_DAYS, annualize
+from price_store import FIELDS
+
+SESSION_MINUTES = 390
+AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+SUMMARY_KEYS = ['bars', 'start', 'end', 'total_ret', 'ann_ret', 'ann_vol', 'sharpe', 'sortino',
+                'calmar', 'max_dd', 'max_dd_date']
+
+
+def periods_per_year(rule, session_minutes=SESSION_MINUTES):
+    offset = to_offset(rule)
+    # 日线及以上按交易日折算；Day 在新版pandas中不能直接转成 Timedelta，单独处理
+    if isinstance(offset, (Day, BDay)):
+        return TRADING_DAYS / offset.n
+    step = pd.Timedelta(offset.nanos)
+    if step >= pd.Timedelta(days=1):
+        return TRADING_DAYS / (step / pd.Timedelta(days=1))
+    return TRADING_DAYS * session_minutes / (step / pd.Timedelta(minutes=1))
+
+
+def downcast(df):
+    floats = df.select_dtypes(include=['float64', 'int64']).columns
+    return df.astype({c: 'float32' for c in floats})
+
+
+def read_chunks(path, chunksize=1_000_000, time_col='Datetime', symbol_col=None):
+    columns = [time_col] + ([symbol_col] if symbol_col else []) + FIELDS
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        batches = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns))
+    else:
+        batches = pd.read_csv(path, chunksize=chunksize, usecols=lambda c: c in columns,
+                              dtype={c: 'float32' for c in FIELDS})
+    for chunk in batches:
+        chunk[time_col] = pd.to_datetime(chunk[time_col])
+        yield downcast(chunk.set_index(time_col))
+
+
+class Resampler:
+    def __init__(self, rule=None):
+        self.rule = rule
+        self.origin = None
+        self.pending = None
+
+    def feed(self, bars):
+        if self.rule is None or bars.empty:
+            return bars
+        if self.origin is None:
+            # 时间桶的起点固定为首块第一天的零点（与整文件重采样的默认 start_day 一致），
+            # 否则周期不能整除一天时各块的桶边界会随分块位置移动
+            self.origin = bars.index[0].normalize()
+        out = bars.resample(self.rule, origin=self.origin).agg({c: AGG[c] for c in bars.columns if c in AGG})
+        out = out[out['Close'].notna()]
+        if out.empty:
+            return out
+        if self.pending is not None:
+            if out.index[0] == self.pending.index[0]:
+                # 上一块末尾的未完成K线与本块第一根属于同一时间桶，合并后继续等待
+                first, prev = out.iloc[0].copy(), self.pending.iloc[0]
+                first['Open'] = prev['Open']
+                first['High'] = max(prev['High'], first['High'])
+                first['Low'] = min(prev['Low'], first['Low'])
+                if 'Volume' in first:
+                    first['Volume'] += prev['Volume']
+                out.iloc[0] = first
+            else:
+                out = pd.concat([self.pending, out])
+        self.pending = out.iloc[-1:]
+        return out.iloc[:-1]
+
+    def flush(self):
+        out, self.pending = self.pending, None
+        return out if out is not None else pd.DataFrame(columns=list(AGG))
+
+
+class StreamStats:
+    def __init__(self, periods=TRADING_DAYS):
+        self.periods = periods
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.neg_n = 0
+        self.neg_sum = 0.0
+        self.neg_sq = 0.0
+        self.wealth = 1.0
+        self.peak = 1.0
+        self.max_dd = 0.0
+        self.max_dd_date = None
+        self.last_close = None
+        self.start = None
+        self.end = None
+
+    def update(self, close):
+        if len(close) == 0:
+            return
+        c = np.asarray(close, dtype='float64')
+        if self.start is None:
+            self.start = close.index[0]
+        self.end = close.index[-1]
+        prev = np.concatenate([[self.last_close], c[:-1]]) if self.last_close is not None else c[:-1]
+        r = c[-len(prev):] / prev - 1 if len(prev) else c[:0]
+        self.last_close = c[-1]
+        if not len(r):
+            return
+
+        # Chan/Welford合并：块内均值与二阶矩并入全局累计量，结果与整段计算一致
+        n_b, mean_b = len(r), r.mean()
+        m2_b = ((r - mean_b) ** 2).sum()
+        delta = mean_b - self.mean
+        total = self.n + n_b
+        self.mean += delta * n_b / total
+        self.m2 += m2_b + delta ** 2 * self.n * n_b / total
+        self.n = total
+
+        neg = r[r < 0]
+        self.neg_n += len(neg)
+        self.neg_sum += neg.sum()
+        self.neg_sq += (neg * neg).sum()
+
+        wealth = self.wealth * np.cumprod(1 + r)
+        peak = np.maximum.accumulate(np.maximum(wealth, self.peak))
+        dd = wealth / peak - 1
+        i = dd.argmin()
+        if dd[i] < self.max_dd:
+            self.max_dd = dd[i]
+            self.max_dd_date = close.index[len(close) - len(r) + i]
+        self.wealth, self.peak = wealth[-1], peak[-1]
+
+    def result(self):
+        n, periods = self.n, self.periods
+        total_ret = self.wealth - 1
+        ann_ret = annualize(total_ret, n, periods) if n else np.nan
+        ann_vol = np.sqrt(self.m2 / (n - 1) * periods) if n > 1 else np.nan
+        downside = np.nan
+        if self.neg_n > 1:
+            downside = np.sqrt((self.neg_sq - self.neg_sum ** 2 / self.neg_n) / (self.neg_n - 1) * periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'bars': n + (1 if self.last_close is not None else 0),
+                'start': self.start, 'end': self.end,
+                'total_ret': total_ret, 'ann_ret': ann_ret, 'ann_vol': ann_vol,
+                'sharpe': ann_ret / ann_vol if ann_vol else 0.0,
+                'sortino': ann_ret / downside if downside else 0.0,
+                'calmar': ann_ret / abs(self.max_dd) if self.max_dd else 0.0,
+                'max_dd': self.max_dd, 'max_dd_date': self.max_dd_date,
+            }
+
+
+class _SymbolStream:
+    def __init__(self, rule, periods, bars_path=None):
+        self.resampler = Resampler(rule)
+        self.stats = StreamStats(periods)
+        self.bars_path = bars_path
+
+    def _emit(self, bars):
+        if bars is None or bars.empty:
+            return
+        self.stats.update(bars['Close'])
+        if self.bars_path:
+            bars.to_csv(self.bars_path, mode='a', header=not os.path.exists(self.bars_path),
+                        index_label='Datetime')
+
+    def feed(self, bars):
+        self._emit(self.resampler.feed(bars))
+
+    def close(self):
+        self._emit(self.resampler.flush())
+        return self.stats.result()
+
+
+def stream_file(path, rule=None, periods=None, chunksize=1_000_000, time_col='Datetime',
+                symbol_col=None, bars_dir=None, progress=None):
+    if periods is None:
+        periods = periods_per_year(rule or '1min')
+    if bars_dir:
+        os.makedirs(bars_dir, exist_ok=True)
+    default = os.path.splitext(os.path.basename(path))[0]
+    streams = {}
+
+    def stream(symbol):
+        if symbol not in streams:
+            bars_path = os.path.join(bars_dir, f'{symbol}.csv') if bars_dir else None
+            if bars_path and os.path.exists(bars_path):
+                os.remove(bars_path)
+            streams[symbol] = _SymbolStream(rule, periods, bars_path)
+        return streams[symbol]
+
+    rows = 0
+    for chunk in read_chunks(path, chunksize, time_col, symbol_col):
+        if symbol_col:
+            for symbol, group in chunk.groupby(symbol_col, sort=False):
+                stream(symbol).feed(group.drop(columns=symbol_col))
+        else:
+            stream(default).feed(chunk)
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+    result = pd.DataFrame({s: st.close() for s, st in streams.items()}).T
+    return result[SUMMARY_KEYS] if not result.empty else result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分块流式处理分钟线数据')
+    parser.add_argument('path', help='分钟线CSV或Parquet文件，需含时间列和OHLCV列')
+    parser.add_argument('--rule', help='重采样周期，如 5min、30min、1h、1D；不指定则按原始K线计算')
+    parser.add_argument('--periods', type=float, help='年化因子（每年K线数），默认按周期和交易时长推算')
+    parser.add_argument('--session-minutes', type=int, default=SESSION_MINUTES, help='每个交易日的分钟数')
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help='每块读取的行数')
+    parser.add_argument('--time-col', default='Datetime', help='时间列名')
+    parser.add_argument('--symbol-col', help='多只股票混合存放时的代码列名')
+    parser.add_argument('--bars-out', help='把重采样后的K线按股票写入该目录')
+    parser.add_argument('--out', default='intraday_metrics.csv', help='指标汇总CSV路径')
+    args = parser.parse_args(argv)
+
+    periods = args.periods or periods_per_year(args.rule or '1min', args.session_minutes)
+    result = stream_file(args.path, args.rule, periods, args.chunksize, args.time_col, args.symbol_col,
+                         args.bars_out, progress=lambda n: print(f"\r已处理 {n:,} 行", end='', flush=True))
+    print()
+    result.to_csv(args.out)
+    print(result.to_string())
+
+
+if __name__ == '__main__':
+    main()
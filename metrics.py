@@ -0,0 +1,97 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+METRIC_KEYS = ['total_ret', 'ann_ret', 'ann_vol', 'sharpe', 'sortino', 'calmar',
+               'max_dd', 'max_dd_date', 'var95', 'cvar95', 'beta', 'alpha']
+
+
+def _safe_div(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, a / np.where(b != 0, b, 1), 0.0)
+
+
+def drawdown(close):
+    values = np.asarray(close, dtype='float64')
+    dd = values / np.fmax.accumulate(values, axis=0) - 1
+    if isinstance(close, pd.DataFrame):
+        return pd.DataFrame(dd, index=close.index, columns=close.columns)
+    return dd
+
+
+def _nan_reduce(fn, values, *args, **kwargs):
+    # 全NaN的列返回NaN，不发出 RuntimeWarning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return fn(values, *args, axis=0, **kwargs)
+
+
+def annualize(total_ret, n, periods=TRADING_DAYS):
+    return (1 + total_ret) ** (periods / n) - 1
+
+
+def compute_metrics(returns, bench=None, periods=TRADING_DAYS):
+    r = np.asarray(returns, dtype='float64')
+    if r.ndim == 1:
+        r = r[:, None]
+    n = r.shape[0]
+    columns = returns.columns if isinstance(returns, pd.DataFrame) else range(r.shape[1])
+    index = returns.index if isinstance(returns, (pd.DataFrame, pd.Series)) else pd.RangeIndex(n)
+
+    # 每只股票只在自己的有效区间内统计：NaN不计入样本数，也不影响净值
+    valid = ~np.isnan(r)
+    n_valid = valid.sum(axis=0)
+    r0 = np.where(valid, r, 0.0)
+    wealth = np.cumprod(1 + r0, axis=0)
+    total_ret = wealth[-1] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ann_ret = np.where(n_valid > 0, annualize(total_ret, n_valid, periods), np.nan)
+    complete = valid.all()
+    ann_vol = (r.std(axis=0, ddof=1) if complete else _nan_reduce(np.nanstd, r, ddof=1)) * np.sqrt(periods)
+
+    neg_n = (r < 0).sum(axis=0)
+    neg_r = np.minimum(r0, 0)
+    neg_sum = neg_r.sum(axis=0)
+    neg_sq = (neg_r * neg_r).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        downside = np.sqrt((neg_sq - neg_sum ** 2 / neg_n) / (neg_n - 1)) * np.sqrt(periods)
+    downside = np.where(neg_n > 1, downside, np.nan)
+
+    wealth = np.vstack([np.ones((1, r.shape[1])), wealth])
+    dd = wealth / np.maximum.accumulate(wealth, axis=0) - 1
+    max_dd = dd.min(axis=0)
+    dd_dates = index[np.maximum(dd.argmin(axis=0) - 1, 0)]
+    if isinstance(dd_dates, pd.DatetimeIndex):
+        dd_dates = dd_dates.strftime('%Y-%m-%d')
+
+    # nanpercentile 在有NaN时逐列计算，完整数据走快速路径
+    var95 = np.percentile(r, 5, axis=0) if complete else _nan_reduce(np.nanpercentile, r, 5)
+    tail = r <= var95
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cvar95 = np.where(tail, r, 0).sum(axis=0) / tail.sum(axis=0)
+
+    beta = np.zeros(r.shape[1])
+    alpha = np.zeros(r.shape[1])
+    if bench is not None:
+        b = np.asarray(bench, dtype='float64').reshape(-1, 1)
+        pair = valid & ~np.isnan(b)
+        rb = np.where(pair, r, np.nan)
+        bb = np.where(pair, b, np.nan)
+        rc = rb - _nan_reduce(np.nanmean, rb)
+        bc = bb - _nan_reduce(np.nanmean, bb)
+        b_var = np.nansum(bc * bc, axis=0)
+        beta = _safe_div(np.nansum(bc * rc, axis=0), b_var)
+        b_total = np.prod(np.where(pair, 1 + b, 1.0), axis=0) - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alpha = ann_ret - beta * annualize(b_total, pair.sum(axis=0), periods)
+
+    return pd.DataFrame({
+        'total_ret': total_ret, 'ann_ret': ann_ret, 'ann_vol': ann_vol,
+        'sharpe': _safe_div(ann_ret, ann_vol),
+        'sortino': np.where(downside == 0, 0.0, ann_ret / np.where(downside == 0, 1, downside)),
+        'calmar': _safe_div(ann_ret, np.abs(max_dd)),
+        'max_dd': max_dd, 'max_dd_date': np.asarray(dd_dates),
+        'var95': var95, 'cvar95': cvar95,
+        'beta': beta, 'alpha': alpha
+    }, index=columns)[METRIC_KEYS]
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from metrics import TRADING_DAYS
+from strategy import DEFAULT_COST_BPS
+
+RIDGE = 1e-10
+
+
+def _nearest_psd(cov):
+    # 两两重叠区间估计的协方差不一定半正定，把负特征值截为0
+    vals, vecs = np.linalg.eigh((cov + cov.T) / 2)
+    if vals.min() >= 0:
+        return cov
+    return (vecs * np.maximum(vals, 0)) @ vecs.T
+
+
+class PortfolioModel:
+    def __init__(self, returns, periods=TRADING_DAYS, min_periods=20):
+        returns = returns if isinstance(returns, pd.DataFrame) else pd.DataFrame(returns)
+        counts = returns.notna().sum()
+        self.returns = returns[counts.index[counts >= min_periods]]
+        self.assets = list(self.returns.columns)
+        self.periods = periods
+        self.min_periods = min_periods
+        self._mu = None
+        self._cov = None
+        self._lipschitz = None
+
+    @property
+    def mu(self):
+        if self._mu is None:
+            self._mu = self.returns.mean().to_numpy() * self.periods
+        return self._mu
+
+    @property
+    def cov(self):
+        # 协方差只算一次：前沿求解、随机组合评估都复用同一矩阵
+        if self._cov is None:
+            cov = self.returns.cov(min_periods=self.min_periods).fillna(0).to_numpy() * self.periods
+            self._cov = _nearest_psd(cov)
+        return self._cov
+
+    def evaluate(self, weights, rf=0.0):
+        # weights: (组合数, 股票数)，收益和波动一次矩阵乘法得到；
+        # ann_ret 扣除波动拖累换算成复利口径，与 compute_metrics 的年化收益率可直接比较
+        w = np.atleast_2d(np.asarray(weights, dtype='float64'))
+        mean = w @ self.mu
+        var = np.maximum(((w @ self.cov) * w).sum(axis=1), 0)
+        ret = np.expm1(mean - var / 2)
+        vol = np.sqrt(var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(vol > 0, (ret - rf) / vol, 0.0)
+        return pd.DataFrame({'mean': mean, 'ann_ret': ret, 'ann_vol': vol, 'sharpe': sharpe})
+
+    def random_weights(self, n, seed=0):
+        return np.random.default_rng(seed).dirichlet(np.ones(len(self.assets)), n)
+
+    @property
+    def lipschitz(self):
+        if self._lipschitz is None:
+            self._lipschitz = max(float(np.linalg.eigvalsh(self.cov)[-1]), RIDGE)
+        return self._lipschitz
+
+    def solve(self, risk_aversion, max_weight=1.0, max_iter=5000, tol=1e-10):
+        # 批量加速投影梯度(FISTA)：每行一个风险厌恶系数λ，max μ'w - λ/2·w'Σw  s.t. Σw=1, 0<=w<=max_weight
+        # 所有λ同时迭代，每步只需一次 (组合数 x 股票数) @ Σ 的矩阵乘法
+        lam = np.atleast_1d(np.asarray(risk_aversion, dtype='float64'))[:, None]
+        k = len(self.assets)
+        step = 1.0 / (lam * self.lipschitz)
+        w = np.full((len(lam), k), 1.0 / k)
+        y, t = w, 1.0
+        for _ in range(max_iter):
+            grad = lam * (y @ self.cov) - self.mu
+            w_new = project_simplex(y - step * grad, max_weight)
+            t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            y = w_new + (t - 1) / t_new * (w_new - w)
+            done = np.abs(w_new - w).max() < tol
+            w, t = w_new, t_new
+            if done:
+                break
+        return w
+
+    def frontier(self, n_points=50, max_weight=1.0, rf=0.0):
+        # λ从大到小扫过，依次得到最小方差组合到最高收益组合；λ按 收益差/方差 的量级取对数网格
+        scale = max(float(np.ptp(self.mu)), 1e-12) / float(np.mean(np.diag(self.cov)) or 1.0)
+        weights = self.solve(np.logspace(3, -2, n_points) * scale, max_weight)
+        stats = self.evaluate(weights, rf)
+        frontier = pd.concat([stats, pd.DataFrame(weights, columns=self.assets)], axis=1)
+        return frontier.drop_duplicates(subset=['ann_vol']).reset_index(drop=True)
+
+
+def project_simplex(v, cap=1.0, n_iter=60):
+    # 按行投影到 {w: Σw=1, 0<=w<=cap}，即找阈值τ使 Σclip(v-τ, 0, cap) = 1
+    if cap >= 1.0:
+        # 无上限时排序后累加求τ（Duchi等），一次完成
+        u = -np.sort(-v, axis=1)
+        css = np.cumsum(u, axis=1) - 1
+        ks = np.arange(1, v.shape[1] + 1)
+        rho = (u - css / ks > 0).sum(axis=1) - 1
+        tau = css[np.arange(len(v)), rho] / (rho + 1)
+        return np.maximum(v - tau[:, None], 0.0)
+    # 有上限时二分查找τ
+    lo = v.min(axis=1, keepdims=True) - 1.0
+    hi = v.max(axis=1, keepdims=True)
+    for _ in range(n_iter):
+        mid = (lo + hi) / 2
+        over = np.clip(v - mid, 0.0, cap).sum(axis=1, keepdims=True) > 1
+        lo = np.where(over, mid, lo)
+        hi = np.where(over, hi, mid)
+    return np.clip(v - (lo + hi) / 2, 0.0, cap)
+
+
+def rebalance(returns, weights, freq='M', cost_bps=DEFAULT_COST_BPS):
+    # 定期再平衡：每个持有期内各股票净值按 cumprod 漂移，组合净值是 漂移净值 x 权重 的矩阵乘法；
+    # 期初调回目标权重并按换手收取费用，尚未上市或已退市的股票权重在其余股票间重新分配
+    r = returns if isinstance(returns, pd.DataFrame) else pd.DataFrame(returns)
+    w = np.atleast_2d(np.asarray(weights, dtype='float64'))
+    values = r.to_numpy(dtype='float64')
+    valid = ~np.isnan(values)
+    growth = 1 + np.where(valid, values, 0.0)
+    if freq in (None, 'D'):
+        starts = np.arange(len(r))
+    else:
+        periods = r.index.to_period(freq)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    bounds = list(starts) + [len(r)]
+
+    out = np.full((len(r), len(w)), np.nan)
+    turnover = np.zeros((len(r), len(w)))
+    held = np.zeros_like(w)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        active = valid[lo]
+        target = w * active
+        total = target.sum(axis=1, keepdims=True)
+        if not active.any() or not total.any():
+            continue
+        target = target / np.where(total > 0, total, 1)
+        trade = np.abs(target - held).sum(axis=1)
+        turnover[lo] = trade
+        cum = np.cumprod(growth[lo:hi], axis=0)
+        value = cum @ target.T
+        prev = np.vstack([np.ones((1, len(w))), value[:-1]])
+        out[lo:hi] = value / prev - 1
+        out[lo] -= trade * cost_bps / 1e4
+        end = target * cum[-1]
+        held = end / end.sum(axis=1, keepdims=True)
+    return {'returns': pd.DataFrame(out, index=r.index), 'turnover': pd.DataFrame(turnover, index=r.index)}
+
+
+def portfolio_returns(returns, weights):
+    # 每日再平衡到固定权重（不计费用），缺失的股票当日按其余股票的权重比例计算
+    r = np.asarray(returns, dtype='float64')
+    w = np.atleast_2d(np.asarray(weights, dtype='float64'))
+    valid = ~np.isnan(r)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = (np.where(valid, r, 0) @ w.T) / (valid @ w.T)
+    index = returns.index if isinstance(returns, pd.DataFrame) else None
+    return pd.DataFrame(out, index=index)
+
+
+def plot_frontier(ax, frontier, candidates=None, font=None):
+    # 叠加在风险收益散点图上：随机组合云、有效前沿和最大夏普点，单位为%
+    if candidates is not None:
+        ax.scatter(candidates['ann_vol'] * 100, candidates['ann_ret'] * 100, s=4, c=candidates['sharpe'],
+                   cmap='viridis', alpha=0.35, zorder=1, label='随机组合')
+    ax.plot(frontier['ann_vol'] * 100, frontier['ann_ret'] * 100, color='crimson', lw=2, zorder=3,
+            label='有效前沿')
+    best = frontier.loc[frontier['sharpe'].idxmax()]
+    ax.scatter(best['ann_vol'] * 100, best['ann_ret'] * 100, s=220, marker='*', color='crimson', zorder=6,
+               label='最大夏普组合')
+    ax.legend(prop=font, loc='best')
@@ -0,0 +1,92 @@
+import os
+import glob
+import argparse
+import pandas as pd
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_store')
+
+
+def normalize(df, symbol=None):
+    if isinstance(df.columns, pd.MultiIndex):
+        if symbol is not None and symbol in df.columns.get_level_values(1):
+            df = df.xs(symbol, axis=1, level=1)
+        else:
+            df = df.droplevel(1, axis=1)
+    df = df[[c for c in FIELDS if c in df.columns]]
+    df = df.apply(pd.to_numeric, errors='coerce').astype('float64')
+    df.index = pd.to_datetime(df.index, errors='coerce')
+    df = df[df.index.notna()]
+    df.index.name = 'Date'
+    df.columns.name = None
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+class PriceStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, symbol):
+        return os.path.join(self.root, f'{symbol}.parquet')
+
+    def has(self, symbol):
+        return os.path.exists(self.path(symbol))
+
+    def symbols(self):
+        return sorted(os.path.splitext(os.path.basename(p))[0]
+                      for p in glob.glob(os.path.join(self.root, '*.parquet')))
+
+    def write(self, symbol, df):
+        df = normalize(df, symbol)
+        tmp = self.path(symbol) + '.tmp'
+        df.to_parquet(tmp)
+        os.replace(tmp, self.path(symbol))
+        return df
+
+    def merge(self, symbol, df):
+        # 只下载了部分区间时与已存历史按日期合并，重叠日期以新数据为准，不丢失区间外的K线
+        df = normalize(df, symbol)
+        if self.has(symbol):
+            df = pd.concat([self.read(symbol), df])
+        return self.write(symbol, df)
+
+    def read(self, symbol, columns=None, start=None, end=None):
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append(('Date', '<', pd.Timestamp(end)))
+        return pd.read_parquet(self.path(symbol), columns=columns, filters=filters or None, memory_map=True)
+
+    def read_panel(self, symbols, field='Close', start=None, end=None):
+        cols = {s: self.read(s, [field], start, end)[field] for s in symbols if self.has(s)}
+        if not cols:
+            return pd.DataFrame()
+        return pd.concat(cols, axis=1)
+
+    def delete(self, symbol):
+        if self.has(symbol):
+            os.remove(self.path(symbol))
+
+    def import_csv(self, path, symbol=None):
+        symbol = symbol or os.path.splitext(os.path.basename(path))[0]
+        df = pd.read_csv(path, header=[0, 1], index_col=0)
+        return self.write(symbol, normalize(df, symbol).dropna(how='all'))
+
+    def import_csv_dir(self, directory):
+        imported = []
+        for p in sorted(glob.glob(os.path.join(directory, '*.csv'))):
+            symbol = os.path.splitext(os.path.basename(p))[0]
+            self.import_csv(p, symbol)
+            imported.append(symbol)
+        return imported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='导入yfinance格式CSV到本地价格库')
+    parser.add_argument('csv_dir')
+    parser.add_argument('--store', default=DEFAULT_ROOT)
+    args = parser.parse_args()
+    imported = PriceStore(args.store).import_csv_dir(args.csv_dir)
+    print(f"已导入 {len(imported)} 只股票: {', '.join(imported)}")
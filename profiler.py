@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    def __init__(self, enabled=True, memory=False):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = time.perf_counter()
+        self._owns_tracemalloc = False
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        frame = {'peak': 0}
+        if self.memory:
+            # tracemalloc只有一个全局峰值：进入子阶段前把已有峰值记到父阶段，再清零给子阶段单独统计
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['start_mem'] = current
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record = {'name': name, 'start': start - self._t0, 'duration': end - start,
+                      'thread': threading.current_thread().name, 'depth': len(stack)}
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['peak'])
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+                record['peak_mb'] = peak / 2 ** 20
+                record['alloc_mb'] = (current - frame['start_mem']) / 2 ** 20
+            if args:
+                record['args'] = args
+            with self._lock:
+                self.spans.append(record)
+
+    def close(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self.memory = False
+
+    def totals(self, depth=0):
+        out = {}
+        for s in self.spans:
+            if s['depth'] == depth:
+                out[s['name']] = out.get(s['name'], 0.0) + s['duration']
+        return out
+
+    def summary(self, depth=0, limit=6):
+        totals = sorted(self.totals(depth).items(), key=lambda kv: -kv[1])
+        parts = [f"{name} {sec:.2f}s" for name, sec in totals[:limit]]
+        peaks = [s['peak_mb'] for s in self.spans if 'peak_mb' in s]
+        if peaks:
+            parts.append(f"峰值 {max(peaks):.0f}MB")
+        return ', '.join(parts)
+
+    def trace_events(self):
+        pid = os.getpid()
+        tids = {}
+        events = []
+        for s in sorted(self.spans, key=lambda s: s['start']):
+            tid = tids.setdefault(s['thread'], len(tids) + 1)
+            args = dict(s.get('args', {}))
+            if 'peak_mb' in s:
+                args.update(peak_mb=round(s['peak_mb'], 3), alloc_mb=round(s['alloc_mb'], 3))
+            events.append({'name': s['name'], 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': s['start'] * 1e6, 'dur': s['duration'] * 1e6, 'args': args})
+        for thread, tid in tids.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread}})
+        return events
+
+    def write(self, path):
+        # Chrome trace对象格式：chrome://tracing 或 Perfetto 可直接打开，otherData里附带原始阶段数据
+        with self._lock:
+            spans = list(self.spans)
+        data = {'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms',
+                'otherData': {'spans': spans, 'totals': self.totals()}}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+        return path
+
+
+NULL_PROFILER = Profiler(enabled=False)
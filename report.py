@@ -0,0 +1,453 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from metrics import TRADING_DAYS, METRIC_KEYS, compute_metrics, drawdown
+from charts import load_font
+from downsample import LineDownsampler
+from strategy import run_strategy
+from correlation import corr_matrix, plot_corr as corr_heatmap
+from profiler import NULL_PROFILER
+from portfolio import PortfolioModel, plot_frontier
+from align import valid_range
+
+
+def symbol_result(close, strategy='buy_hold', params=None, cost_bps=0.0):
+    # 单只股票只在自身有效区间内回测，结果与面板里其他股票的日期无关，可以按该股票的指纹缓存
+    c = close.loc[close.first_valid_index():close.last_valid_index()].to_frame()
+    result = run_strategy(c, strategy, cost_bps, **(params or {}))
+    returns = result['returns'][close.name]
+    metrics = compute_metrics(returns).iloc[0] if len(returns) > 1 else pd.Series(np.nan, index=METRIC_KEYS)
+    return {'returns': returns, 'drawdown': drawdown(result['equity'])[close.name],
+            'metrics': {k: _json_value(v) for k, v in metrics.items()}}
+
+
+def report_data(close_data, strategy='buy_hold', params=None, cost_bps=0.0, panel=('corr', 'frontier'),
+                symbols=None, intermediates=None):
+    # symbols: 指纹未变、直接复用的单只股票结果；intermediates: 输入未变、直接复用的相关矩阵和有效前沿
+    # panel 指定要计算的整体中间结果：相关矩阵和有效前沿随股票数平方或更快增长，只在需要时计算
+    tickers = list(close_data.columns)
+    symbols = dict(symbols or {})
+    for t in tickers:
+        if t not in symbols:
+            symbols[t] = symbol_result(close_data[t], strategy, params, cost_bps)
+    daily_returns = pd.DataFrame({t: symbols[t]['returns'] for t in tickers}).reindex(close_data.index[1:])
+    cached = dict(intermediates or {})
+    if 'corr' in panel and 'corr' not in cached:
+        cached['corr'] = corr_matrix(daily_returns)
+    if 'frontier' in panel and 'frontier' not in cached:
+        model = PortfolioModel(daily_returns)
+        cached['frontier'] = model.frontier() if len(model.assets) > 1 else None
+    return {
+        'tickers': tickers,
+        'close': close_data,
+        'daily_returns': daily_returns,
+        'cum_ret': (1 + daily_returns).cumprod() - 1,
+        'roll_vol': daily_returns.rolling(window=30).std() * np.sqrt(TRADING_DAYS),
+        'drawdowns': pd.DataFrame({t: symbols[t]['drawdown'] for t in tickers}).reindex(close_data.index),
+        'metrics': pd.DataFrame([symbols[t]['metrics'] for t in tickers], index=tickers, columns=METRIC_KEYS),
+        'corr': cached.get('corr'),
+        'frontier': cached.get('frontier'),
+        'symbols': symbols,
+    }
+
+
+def _line_fig(frame, tickers, scale, title, ylabel, font):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sampler = LineDownsampler(ax)
+    for t in tickers:
+        sampler.plot(frame.index, frame[t] * scale, label=t)
+    ax.set_title(title, fontproperties=font, fontsize=14)
+    ax.set_xlabel('日期', fontproperties=font)
+    ax.set_ylabel(ylabel, fontproperties=font)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def plot_close(d, font):
+    return _line_fig(d['close'], d['tickers'], 1, '收盘价走势', '价格 (USD)', font)
+
+
+def plot_cum_ret(d, font):
+    return _line_fig(d['cum_ret'], d['tickers'], 100, '累计收益率', '累计收益率 (%)', font)
+
+
+def plot_hist(d, font):
+    tickers = d['tickers']
+    ncols = min(len(tickers), 3)
+    nrows = (len(tickers) + ncols - 1) // ncols
+    fig, axes = plt.subplots(nrows, ncols, figsize=(5 * ncols, 5 * nrows), squeeze=False)
+    axes = axes.flatten()
+    for i, t in enumerate(tickers):
+        axes[i].hist(d['daily_returns'][t].dropna(), bins=50, alpha=0.7, edgecolor='black')
+        axes[i].set_title(f'{t}', fontsize=11)
+        axes[i].set_xlabel('收益率', fontproperties=font)
+        axes[i].set_ylabel('频次', fontproperties=font)
+    for ax in axes[len(tickers):]:
+        ax.set_visible(False)
+    fig.suptitle('每日收益率分布', fontproperties=font, fontsize=14)
+    fig.tight_layout()
+    return fig
+
+
+def plot_roll_vol(d, font):
+    return _line_fig(d['roll_vol'], d['tickers'], 100, '30日滚动年化波动率', '波动率 (%)', font)
+
+
+def plot_corr(d, font):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    corr_heatmap(ax, d['corr'])
+    ax.set_title('收益率相关性热力图', fontproperties=font, fontsize=14)
+    fig.tight_layout()
+    return fig
+
+
+def plot_drawdown(d, font):
+    return _line_fig(d['drawdowns'], d['tickers'], 100, '最大回撤', '回撤 (%)', font)
+
+
+def plot_risk_return(d, font):
+    m = d['metrics']
+    fig, ax = plt.subplots(figsize=(10, 7))
+    for t in d['tickers']:
+        ax.scatter(m.loc[t, 'ann_vol'] * 100, m.loc[t, 'ann_ret'] * 100, s=100, zorder=5)
+        ax.annotate(t, (m.loc[t, 'ann_vol'] * 100, m.loc[t, 'ann_ret'] * 100), fontsize=12, ha='left', va='bottom')
+    if d['frontier'] is not None:
+        plot_frontier(ax, d['frontier'], font=font)
+    ax.set_title('风险收益散点图', fontproperties=font, fontsize=14)
+    ax.set_xlabel('年化波动率 (%)', fontproperties=font)
+    ax.set_ylabel('年化收益率 (%)', fontproperties=font)
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def close_lines(d, t):
+    c = d['close'][t].dropna()
+    return [f"{t}: 起始价={c.iloc[0]:.2f}, 最终价={c.iloc[-1]:.2f}, 最高价={c.max():.2f}, 最低价={c.min():.2f}"]
+
+
+def cum_ret_lines(d, t):
+    c = d['cum_ret'][t].dropna()
+    return [f"{t}: 最终={c.iloc[-1]*100:.2f}%, 最高={c.max()*100:.2f}%, 最低={c.min()*100:.2f}%"]
+
+
+def hist_lines(d, t):
+    r = d['daily_returns'][t]
+    return [f"{t}: 均值={r.mean()*100:.4f}%, 标准差={r.std()*100:.4f}%, 偏度={r.skew():.4f}, 峰度={r.kurtosis():.4f}"]
+
+
+def roll_vol_lines(d, t):
+    rv = d['roll_vol'][t].dropna()
+    return [f"{t}: 均值={rv.mean()*100:.2f}%, 最高={rv.max()*100:.2f}%, 最低={rv.min()*100:.2f}%"]
+
+
+def text_corr(d):
+    tickers, corr = d['tickers'], d['corr']
+    return [f"{tickers[i]}-{tickers[j]}: {corr.iloc[i, j]:.4f}"
+            for i in range(len(tickers)) for j in range(i + 1, len(tickers))]
+
+
+def drawdown_lines(d, t):
+    dd = d['drawdowns'][t]
+    return [f"{t}: 最大回撤={dd.min()*100:.2f}%, 日期={dd.idxmin().strftime('%Y-%m-%d')}"]
+
+
+def risk_return_lines(d, t):
+    m = d['metrics']
+    return [f"{t}: 年化收益率={m.loc[t, 'ann_ret']*100:.2f}%, 年化波动率={m.loc[t, 'ann_vol']*100:.2f}%, 夏普比率={m.loc[t, 'sharpe']:.4f}"]
+
+
+def text_frontier(d):
+    f = d['frontier']
+    if f is None:
+        return []
+    txt = []
+    for label, i in (('最小方差组合', f['ann_vol'].idxmin()), ('最大夏普组合', f['sharpe'].idxmax())):
+        w = f.loc[i, [t for t in d['tickers'] if t in f.columns]]
+        weights = ', '.join(f"{t} {v*100:.1f}%" for t, v in w[w > 5e-4].items())
+        txt.append(f"{label}: 预期年化收益率={f.loc[i, 'ann_ret']*100:.2f}%, 年化波动率={f.loc[i, 'ann_vol']*100:.2f}%, "
+                   f"夏普比率={f.loc[i, 'sharpe']:.4f}, 权重: {weights}")
+    return txt
+
+
+def text_period(d):
+    close = d['close']
+    return [f"回测区间: {close.index[0].strftime('%Y-%m-%d')} ~ {close.index[-1].strftime('%Y-%m-%d')}",
+            f"交易日数: {len(d['daily_returns'])}"]
+
+
+def summary_lines(d, t):
+    m = d['metrics']
+    return [f"\n{t}:",
+            f"  总收益率: {m.loc[t, 'total_ret']*100:.2f}%",
+            f"  年化收益率: {m.loc[t, 'ann_ret']*100:.2f}%",
+            f"  年化波动率: {m.loc[t, 'ann_vol']*100:.2f}%",
+            f"  夏普比率: {m.loc[t, 'sharpe']:.4f}",
+            f"  最大回撤: {m.loc[t, 'max_dd']*100:.2f}%"]
+
+
+FIGURES = [
+    (1, '收盘价走势', '图1_收盘价走势', plot_close),
+    (2, '累计收益率', '图2_累计收益率', plot_cum_ret),
+    (3, '每日收益率分布', '图3_每日收益率分布', plot_hist),
+    (4, '滚动波动率', '图4_30日滚动年化波动率', plot_roll_vol),
+    (5, '相关性热力图', '图5_收益率相关性热力图', plot_corr),
+    (6, '最大回撤', '图6_最大回撤', plot_drawdown),
+    (7, '风险收益散点图', '图7_风险收益散点图', plot_risk_return),
+]
+# 每段文字: (标题, 开头的整体部分, 逐只股票的部分, 结尾的整体部分)；逐只股票的行按该股票的指纹缓存，
+# 整体部分按全部股票指纹的组合缓存
+SECTIONS = [
+    ('图1_收盘价走势', None, close_lines, None),
+    ('图2_累计收益率', None, cum_ret_lines, None),
+    ('图3_每日收益率分布', None, hist_lines, None),
+    ('图4_30日滚动年化波动率', None, roll_vol_lines, None),
+    ('图5_收益率相关性热力图', None, None, text_corr),
+    ('图6_最大回撤', None, drawdown_lines, None),
+    ('图7_风险收益散点图', None, risk_return_lines, text_frontier),
+    ('回测汇总', text_period, summary_lines, None),
+]
+# 只用到收盘价的部分，策略参数和费率变化时不必重新生成；其余部分依赖策略收益
+CLOSE_ONLY = {'图1_收盘价走势'}
+# 需要相关矩阵或有效前沿这类整体中间结果的部分，这些部分都未变化时不计算它们
+PANEL_INPUTS = {'图5_收益率相关性热力图': 'corr', '图7_风险收益散点图': 'frontier'}
+MANIFEST = '.report_manifest.json'
+# 单只股票的收益率/回撤序列和相关矩阵、有效前沿的缓存目录，对应的指纹和指标记录在清单中
+CACHE_DIR = '.report_cache'
+
+
+def fingerprint(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        if isinstance(p, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(p, index=True).to_numpy().tobytes())
+            h.update(repr(list(p.columns) if isinstance(p, pd.DataFrame) else p.name).encode())
+        else:
+            h.update(repr(p).encode())
+    return h.hexdigest()
+
+
+def save_fig(fig, path, fmt='png', dpi=150):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        fig.savefig(tmp, format=fmt, dpi=dpi, bbox_inches='tight')
+        os.replace(tmp, path)
+    finally:
+        plt.close(fig)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def render_figure(num, name, d, out_dir, fmt='png', dpi=150, font_path=None):
+    plot_fn = next(f[3] for f in FIGURES if f[0] == num)
+    path = os.path.join(out_dir, f"图{num}_{name}.{fmt}")
+    with plt.rc_context({'figure.dpi': dpi}):
+        fig = plot_fn(d, load_font(font_path))
+    save_fig(fig, path, fmt, dpi)
+    return path
+
+
+def render_figures(d, out_dir, fmt='png', dpi=150, font_path=None, workers=1, figures=None):
+    jobs = [(num, name) for num, name, _, _ in FIGURES if figures is None or num in figures]
+    if workers <= 1:
+        return [render_figure(num, name, d, out_dir, fmt, dpi, font_path) for num, name in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(render_figure, num, name, d, out_dir, fmt, dpi, font_path) for num, name in jobs]
+        return [f.result() for f in futures]
+
+
+def section_lines(d, head_fn, ticker_fn, tail_fn):
+    lines = head_fn(d) if head_fn else []
+    if ticker_fn:
+        lines += [line for t in d['tickers'] for line in ticker_fn(d, t)]
+    return lines + (tail_fn(d) if tail_fn else [])
+
+
+def summary_text(d):
+    return format_sections({title: section_lines(d, *fns) for title, *fns in SECTIONS})
+
+
+def _load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_text(path, text):
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+    _write_atomic(path, write)
+
+
+def _read_cached(path):
+    try:
+        return pd.read_parquet(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_symbols(cache_dir, entries, keys):
+    symbols = {}
+    for t, key in keys.items():
+        entry = entries.get(t)
+        frame = _read_cached(os.path.join(cache_dir, 'symbols', f"{t}.parquet")) \
+            if entry is not None and entry['key'] == key else None
+        if frame is not None:
+            symbols[t] = {'returns': frame['returns'].iloc[1:], 'drawdown': frame['drawdown'],
+                          'metrics': entry['metrics']}
+    return symbols
+
+
+def _load_intermediates(cache_dir, entries, names, key):
+    loaded = {}
+    for name in names:
+        frame = _read_cached(os.path.join(cache_dir, f"{name}.parquet")) if entries.get(name) == key else None
+        if frame is not None:
+            loaded[name] = None if frame.empty else frame
+    return loaded
+
+
+def _json_value(v):
+    if isinstance(v, str):
+        return v
+    return None if np.isnan(v) else float(v)
+
+
+def summary_records(d, sections):
+    close = d['close']
+    return {
+        'start': close.index[0].strftime('%Y-%m-%d'),
+        'end': close.index[-1].strftime('%Y-%m-%d'),
+        'trading_days': len(d['daily_returns']),
+        'metrics': {t: {k: _json_value(v) for k, v in row.items()}
+                    for t, row in d['metrics'].to_dict('index').items()},
+        'sections': sections,
+    }
+
+
+def format_sections(sections):
+    txt = []
+    for title, lines in sections.items():
+        if txt:
+            txt.append("")
+        txt.extend(["=" * 60, title, "=" * 60])
+        txt.extend(lines)
+    return '\n'.join(txt)
+
+
+def write_report(close_data, out_dir, fmt='png', dpi=150, font_path=None, workers=1,
+                 strategy='buy_hold', params=None, cost_bps=0.0, profiler=NULL_PROFILER, force=False):
+    txt_path = os.path.join(out_dir, '图表详情汇总.txt')
+    json_path = os.path.join(out_dir, 'report_summary.json')
+    parquet_path = os.path.join(out_dir, 'report_metrics.parquet')
+    fig_paths = {num: os.path.join(out_dir, f"图{num}_{name}.{fmt}") for num, name, _, _ in FIGURES}
+    outputs = list(fig_paths.values()) + [txt_path, json_path, parquet_path]
+
+    # 输入（收盘价面板与策略参数）指纹不变且产物齐全时整份报告直接跳过
+    manifest = {} if force else _load_manifest(out_dir)
+    style = fingerprint(fmt, dpi, font_path)
+    input_key = fingerprint(close_data, strategy, params or {}, cost_bps)
+    if manifest.get('input') == input_key and manifest.get('style') == style and all(map(os.path.exists, outputs)):
+        return outputs
+
+    # 每只股票按自身有效区间内的收盘价（含区间内其他股票带来的空行）取指纹，策略相关的部分再加上策略参数；
+    # 各图表和文字只由它实际用到的股票指纹组合而成，只追加一只股票的K线时，其余股票的文字直接复用
+    with profiler.span('指纹'):
+        tickers = list(close_data.columns)
+        first, last = valid_range(close_data)
+        close_keys = {t: fingerprint(close_data[t].loc[first[t]:last[t]] if pd.notna(first[t]) else None)
+                      for t in tickers}
+        ret_keys = {t: fingerprint(close_keys[t], strategy, params or {}, cost_bps) for t in tickers}
+    symbol_keys = {title: close_keys if title in CLOSE_ONLY else ret_keys for title, *_ in SECTIONS}
+    panel_keys = {title: fingerprint([(t, keys[t]) for t in tickers]) for title, keys in symbol_keys.items()}
+    figure_keys = {num: fingerprint(style, panel_keys[title]) for num, _, title, _ in FIGURES}
+    old_figures = manifest.get('figures', {})
+    stale = [num for num in fig_paths
+             if old_figures.get(str(num)) != figure_keys[num] or not os.path.exists(fig_paths[num])]
+    old_lines, old_panel = manifest.get('lines', {}), manifest.get('panel', {})
+    stale_panel = {title for title, key in panel_keys.items() if old_panel.get(title, {}).get('key') != key}
+    need = {PANEL_INPUTS[title] for num, _, title, _ in FIGURES if title in PANEL_INPUTS
+            and (num in stale or title in stale_panel)}
+
+    # 单只股票的收益率、回撤和指标按该股票的策略指纹缓存，相关矩阵和有效前沿按全部股票指纹的组合缓存，
+    # 只回测指纹变化的股票，整体中间结果只在输入变化时重新计算
+    cache_dir = os.path.join(out_dir, CACHE_DIR)
+    returns_key = fingerprint([(t, ret_keys[t]) for t in tickers])
+    old_symbols, old_intermediates = manifest.get('symbols', {}), manifest.get('intermediates', {})
+    with profiler.span('读取缓存'):
+        reused = _load_symbols(cache_dir, old_symbols, ret_keys)
+        loaded = _load_intermediates(cache_dir, old_intermediates, need, returns_key)
+    with profiler.span('报告数据', panel=','.join(sorted(need - set(loaded))), symbols=len(tickers) - len(reused)):
+        d = report_data(close_data, strategy, params, cost_bps, need, reused, loaded)
+    os.makedirs(os.path.join(cache_dir, 'symbols'), exist_ok=True)
+    for t in tickers:
+        if t not in reused:
+            r = d['symbols'][t]
+            frame = pd.DataFrame({'returns': r['returns'], 'drawdown': r['drawdown']})
+            _write_atomic(os.path.join(cache_dir, 'symbols', f"{t}.parquet"), frame.to_parquet)
+    for name in need - set(loaded):
+        frame = d[name] if d[name] is not None else pd.DataFrame()
+        _write_atomic(os.path.join(cache_dir, f"{name}.parquet"), frame.to_parquet)
+    with profiler.span('渲染图表', workers=workers, figures=len(stale)):
+        if stale:
+            render_figures(d, out_dir, fmt, dpi, font_path, workers, figures=stale)
+
+    with profiler.span('汇总文本'):
+        sections, lines_cache, panel_cache = {}, {}, {}
+        for title, head_fn, ticker_fn, tail_fn in SECTIONS:
+            hit = old_panel.get(title)
+            if title in stale_panel or hit is None:
+                hit = {'key': panel_keys[title], 'head': head_fn(d) if head_fn else [],
+                       'tail': tail_fn(d) if tail_fn else []}
+            panel_cache[title] = hit
+            lines = list(hit['head'])
+            if ticker_fn:
+                cached, keys = old_lines.get(title, {}), symbol_keys[title]
+                lines_cache[title] = {}
+                for t in tickers:
+                    row = cached.get(t)
+                    if row is None or row['key'] != keys[t]:
+                        row = {'key': keys[t], 'lines': ticker_fn(d, t)}
+                    lines_cache[title][t] = row
+                    lines.extend(row['lines'])
+            sections[title] = lines + hit['tail']
+        _write_text(txt_path, format_sections(sections))
+        _write_text(json_path, json.dumps(summary_records(d, sections), ensure_ascii=False, indent=1))
+        _write_atomic(parquet_path, d['metrics'].to_parquet)
+
+    manifest = {
+        'input': input_key, 'style': style,
+        'figures': {str(num): key for num, key in figure_keys.items()},
+        'lines': lines_cache, 'panel': panel_cache,
+        'symbols': {t: {'key': ret_keys[t], 'metrics': d['symbols'][t]['metrics']} for t in tickers},
+        'intermediates': dict(old_intermediates, **{name: returns_key for name in need}),
+        'rebuilt': stale,
+        'backtested': sorted(t for t in tickers if t not in reused),
+        'computed': sorted(need - set(loaded)),
+        'recomputed': sorted(t for t in tickers if any(
+            old_lines.get(title, {}).get(t, {}).get('key') != symbol_keys[title][t] for title in lines_cache)),
+    }
+    _write_text(os.path.join(out_dir, MANIFEST), json.dumps(manifest, ensure_ascii=False))
+    return outputs
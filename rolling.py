@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from metrics import TRADING_DAYS
+
+
+def _as_2d(values):
+    x = np.asarray(values, dtype='float64')
+    return x[:, None] if x.ndim == 1 else x
+
+
+def _wrap(out, like):
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(out, index=like.index, columns=like.columns)
+    if isinstance(like, pd.Series):
+        return pd.Series(out[:, 0], index=like.index, name=like.name)
+    return out
+
+
+def _diff_window(c, window):
+    out = np.full(c.shape, np.nan)
+    if window <= len(c):
+        out[window - 1] = c[window - 1]
+        out[window:] = c[window:] - c[:-window]
+    return out
+
+
+def window_sum(values, window):
+    x = _as_2d(values)
+    valid = ~np.isnan(x)
+    if valid.all():
+        return _diff_window(np.cumsum(x, axis=0), window)
+    # 含NaN时分别累计数值和有效个数，窗口内有缺失则结果为NaN（与pandas rolling默认行为一致）
+    out = _diff_window(np.cumsum(np.where(valid, x, 0.0), axis=0), window)
+    count = _diff_window(np.cumsum(valid, axis=0), window)
+    out[count < window] = np.nan
+    return out
+
+
+def _moments(x, y, window):
+    n = window
+    sx, sy = window_sum(x, window), window_sum(y, window)
+    cov = (window_sum(x * y, window) - sx * sy / n) / (n - 1)
+    var_y = (window_sum(y * y, window) - sy * sy / n) / (n - 1)
+    return sx / n, sy / n, cov, var_y
+
+
+def rolling_sharpe(returns, window, periods=TRADING_DAYS):
+    r = _as_2d(returns)
+    s, sq = window_sum(r, window), window_sum(r * r, window)
+    var = (sq - s * s / window) / (window - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = s / window / np.sqrt(np.maximum(var, 0)) * np.sqrt(periods)
+    return _wrap(out, returns)
+
+
+def rolling_sortino(returns, window, periods=TRADING_DAYS):
+    r = _as_2d(returns)
+    neg = np.minimum(r, 0)
+    k = window_sum(r < 0, window)
+    s, sq = window_sum(neg, window), window_sum(neg * neg, window)
+    mean = window_sum(r, window) / window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        downside = np.sqrt(np.maximum(sq - s * s / k, 0) / (k - 1))
+        out = mean * periods / (downside * np.sqrt(periods))
+    return _wrap(np.where(k > 1, out, np.nan), returns)
+
+
+def rolling_beta(returns, bench, window):
+    r, b = _as_2d(returns), _as_2d(bench)
+    _, _, cov, var_b = _moments(r, b, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = cov / var_b
+    return _wrap(out, returns)
+
+
+def rolling_alpha(returns, bench, window, periods=TRADING_DAYS):
+    r, b = _as_2d(returns), _as_2d(bench)
+    mean_r, mean_b, cov, var_b = _moments(r, b, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (mean_r - cov / var_b * mean_b) * periods
+    return _wrap(out, returns)
+
+
+def rolling_max(values, window):
+    # van Herk/Gil-Werman：按窗口分块求前缀/后缀最大值，每个元素O(1)且整列向量化
+    x = _as_2d(values)
+    n, k = x.shape
+    window = max(min(window, n), 1)
+    m = -(-n // window) * window
+    padded = np.full((m, k), -np.inf)
+    padded[:n] = np.where(np.isnan(x), -np.inf, x)
+    blocks = padded.reshape(-1, window, k)
+    prefix = np.maximum.accumulate(blocks, axis=1).reshape(m, k)
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(m, k)
+    out = np.empty((n, k))
+    out[:window - 1] = prefix[:min(window - 1, n)]
+    out[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+    out[np.isinf(out)] = np.nan
+    return _wrap(out, values)
+
+
+def rolling_drawdown(close, window):
+    c = _as_2d(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = c / np.asarray(rolling_max(c, window)) - 1
+    return _wrap(out, close)
+
+
+def rolling_metrics(returns, equity, bench=None, window=60, periods=TRADING_DAYS):
+    result = {
+        'sharpe': rolling_sharpe(returns, window, periods),
+        'sortino': rolling_sortino(returns, window, periods),
+        'drawdown': rolling_drawdown(equity, window),
+    }
+    if bench is not None:
+        result['beta'] = rolling_beta(returns, bench, window)
+        result['alpha'] = rolling_alpha(returns, bench, window, periods)
+    return result
@@ -0,0 +1,262 @@
+import os
+import json
+import tempfile
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlparse
+import pandas as pd
+from data_cache import PriceCache, FrameMemo, FrameProvider, covered_end
+from price_store import PriceStore, DEFAULT_ROOT
+from fetcher import iter_frames
+from analysis import analyze
+from strategy import DEFAULT_COST_BPS
+from profiler import NULL_PROFILER
+from service_client import DEFAULT_ADDRESS, RESULT_TYPE, encode_result
+
+FETCH_WORKERS = 8
+RESULT_CACHE_SIZE = 32
+
+
+class _Downloader:
+    # frames 已逐只查过内存缓存，交给 iter_frames 的接口直接下载，每只股票只查询一次内存缓存
+    def __init__(self, service):
+        self.get = service.fetch
+
+
+class AnalysisService:
+    def __init__(self, cache=None, memo=None, workers=FETCH_WORKERS, max_results=RESULT_CACHE_SIZE,
+                 sim_workers=1):
+        self.cache = cache or PriceCache()
+        self.memo = memo or FrameMemo()
+        self.workers = workers
+        self.sim_workers = sim_workers
+        self.max_results = max_results
+        self.counts = {'requests': 0, 'coalesced': 0, 'result_hits': 0, 'downloads': 0}
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = OrderedDict()
+
+    def _shared(self, key, fn):
+        # 相同key的并发请求只执行一次，其余请求等待同一个结果
+        with self._lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+            else:
+                self.counts['coalesced'] += 1
+        if not owner:
+            return fut.result()
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return fut.result()
+
+    def fetch(self, symbol, start, end):
+        # 不查内存缓存，合并并发下载同一只股票的请求
+        def load():
+            with self._lock:
+                self.counts['downloads'] += 1
+            df = self.cache.get(symbol, start, end)
+            if not df.empty:
+                self.memo.put(symbol, start, end, df)
+            return df
+        return self._shared(('frame', symbol, str(start), str(end)), load)
+
+    def get(self, symbol, start, end):
+        # 缓存接口：先查内存，未命中再下载
+        df = self.memo.get(symbol, start, end)
+        return df if df is not None else self.fetch(symbol, start, end)
+
+    def frames(self, symbols, start, end, cancel=None, on_frame=None, profiler=NULL_PROFILER):
+        frames, missing = {}, []
+        with profiler.span('内存缓存'):
+            for symbol in symbols:
+                df = self.memo.get(symbol, start, end)
+                if df is None:
+                    missing.append(symbol)
+                    continue
+                if not df.empty:
+                    frames[symbol] = df
+                if on_frame:
+                    on_frame(symbol, df if not df.empty else None, len(symbols) - len(missing), len(symbols))
+        hits = len(symbols) - len(missing)
+        with profiler.span('获取数据', tickers=len(missing)):
+            fetched = iter_frames(_Downloader(self), missing, start, end, self.workers, cancel=cancel)
+            for i, (symbol, df) in enumerate(fetched):
+                if df is not None:
+                    frames[symbol] = df
+                if on_frame:
+                    on_frame(symbol, df, hits + i + 1, len(symbols))
+        return frames, hits
+
+    def _compute(self, tickers, bench, start, end, strategy, cost_bps, simulation, optimize,
+                 cancel, on_frame, profiler):
+        all_tickers = list(dict.fromkeys(tickers + [bench]))
+        frames, hits = self.frames(all_tickers, start, end, cancel, on_frame, profiler)
+        if cancel is not None and cancel.is_set():
+            return None
+        if not any(t in frames for t in tickers):
+            raise ValueError('股票数据获取失败')
+        with profiler.span('计算'):
+            data = analyze(frames, tickers, bench, strategy, cost_bps, profiler, simulation, self.sim_workers,
+                           optimize)
+        data['failed'] = [s for s in all_tickers if s not in frames]
+        data['memo_hits'] = hits
+        return data
+
+    def analyze(self, tickers, bench, start, end, strategy='买入持有', cost_bps=DEFAULT_COST_BPS,
+                simulation=False, optimize=False, cancel=None, on_frame=None, profiler=NULL_PROFILER):
+        with self._lock:
+            self.counts['requests'] += 1
+        if cancel is not None or on_frame is not None:
+            # 本地GUI直接调用：逐只回报进度并可取消，只在单只股票的下载上与其他请求合并
+            return self._compute(tickers, bench, start, end, strategy, cost_bps, simulation, optimize,
+                                 cancel, on_frame, profiler)
+        # 键中加上截至今天的结束日期：结束日期在未来的请求跨日后不会复用前一天的结果
+        key = ('analyze', tuple(tickers), bench, start, end, covered_end(end), strategy, float(cost_bps),
+               bool(simulation), bool(optimize))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.counts['result_hits'] += 1
+                return dict(self._results[key])
+        data = self._shared(key, lambda: self._compute(tickers, bench, start, end, strategy, cost_bps,
+                                                       simulation, optimize, None, None, profiler))
+        with self._lock:
+            self._results[key] = data
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return dict(data)
+
+    def health(self):
+        with self._lock:
+            counts = dict(self.counts)
+            inflight = len(self._inflight)
+        return dict(counts, inflight=inflight, memo_symbols=len(self.memo.entries),
+                    memo_mb=round(self.memo.nbytes() / 2 ** 20, 1),
+                    memo_hits=self.memo.hits, memo_misses=self.memo.misses)
+
+
+def _json_frame(df):
+    return json.loads(df.to_json(orient='index', date_format='iso')) if df is not None else None
+
+
+def summary(data):
+    stats = pd.DataFrame.from_dict(data['stats'], orient='index')
+    sim = data['sim']
+    return {
+        'stock_cols': data['stock_cols'], 'failed': data['failed'],
+        'start': data['close'].index[0].strftime('%Y-%m-%d'),
+        'end': data['close'].index[-1].strftime('%Y-%m-%d'),
+        'stats': _json_frame(stats),
+        'corr': _json_frame(data['corr']),
+        'sim': _json_frame(sim.set_axis([f'{m}_{k}' for m, k in sim.columns], axis=1)) if sim is not None else None,
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, body, content_type='application/json; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode('utf-8'))
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path not in ('/analyze', '/metrics'):
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            data = self.service.analyze([t.upper() for t in req['tickers']], req.get('bench', 'SPY').upper(),
+                                        req['start'], req['end'], req.get('strategy', '买入持有'),
+                                        float(req.get('cost_bps', DEFAULT_COST_BPS)), bool(req.get('simulation')),
+                                        bool(req.get('optimize')))
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+        if path == '/metrics':
+            self._send_json(200, summary(data))
+        else:
+            # 完整结果字典返回给GUI：DataFrame用Arrow IPC，其余用JSON，客户端解码时不执行任何代码
+            self._send(200, encode_result(data), RESULT_TYPE)
+
+    def log_message(self, fmt, *args):
+        print(f"[{self.log_date_time_string()}] {fmt % args}")
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+def make_server(service, address=DEFAULT_ADDRESS):
+    handler = type('BoundHandler', (Handler,), {'service': service})
+    url = urlparse(address)
+    if url.scheme == 'unix':
+        return UnixHTTPServer(url.path, handler)
+    port = url.port if url.port is not None else 8765
+    server = ThreadingHTTPServer((url.hostname or '127.0.0.1', port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地分析服务：多个GUI共享数据缓存和计算结果')
+    parser.add_argument('--address', default=DEFAULT_ADDRESS,
+                        help='监听地址，如 http://127.0.0.1:8765 或 unix:/tmp/stock_service.sock')
+    parser.add_argument('--store', default=DEFAULT_ROOT, help='本地价格库目录')
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS, help='下载线程数')
+    parser.add_argument('--sim-workers', type=int, default=os.cpu_count() or 1, help='风险模拟进程数')
+    parser.add_argument('--memo-mb', type=int, default=512, help='内存缓存上限 (MB)')
+    parser.add_argument('--demo', type=int, metavar='N',
+                        help='不联网，用N只合成股票（S00000... 和基准BENCH）作为数据源，便于测试')
+    args = parser.parse_args(argv)
+
+    store, provider = args.store, None
+    if args.demo:
+        from benchmark import synthetic_ohlcv
+        store, provider = tempfile.mkdtemp(prefix='stock_service_'), FrameProvider(synthetic_ohlcv(args.demo, 5))
+    service = AnalysisService(PriceCache(PriceStore(store), provider), FrameMemo(args.memo_mb * 2 ** 20),
+                              args.workers, sim_workers=args.sim_workers)
+    server = make_server(service, args.address)
+    print(f"分析服务已启动: {args.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import json
+import socket
+import struct
+import http.client
+from urllib.parse import urlparse
+
+DEFAULT_ADDRESS = 'http://127.0.0.1:8765'
+RESULT_TYPE = 'application/x-stock-result'
+_HEADER = struct.Struct('>Q')
+
+
+def _pack(value, blobs):
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        blobs.append(_to_ipc(value))
+        return {'__frame__': len(blobs) - 1}
+    if isinstance(value, pd.Series):
+        blobs.append(_to_ipc(value.to_frame('values')))
+        return {'__series__': len(blobs) - 1, 'name': value.name}
+    if isinstance(value, dict):
+        return {str(k): _pack(v, blobs) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack(v, blobs) for v in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def _unpack(value, blobs):
+    if isinstance(value, dict):
+        if '__frame__' in value:
+            return _from_ipc(blobs[value['__frame__']])
+        if '__series__' in value:
+            return _from_ipc(blobs[value['__series__']])['values'].rename(value['name'])
+        return {k: _unpack(v, blobs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_unpack(v, blobs) for v in value]
+    return value
+
+
+def _to_ipc(df):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(blob):
+    import pyarrow as pa
+    return pa.ipc.open_stream(blob).read_all().to_pandas()
+
+
+def encode_result(data):
+    # 结果字典中的DataFrame/Series各自编码为Arrow IPC流，其余标量、列表和字典编码为JSON；
+    # 格式: 8字节JSON头长度 + JSON头 + 依次拼接的Arrow数据块。解码不会执行任何代码
+    blobs = []
+    header = json.dumps({'data': _pack(data, blobs), 'blobs': [len(b) for b in blobs]},
+                        ensure_ascii=False).encode('utf-8')
+    return b''.join([_HEADER.pack(len(header)), header, *blobs])
+
+
+def decode_result(body):
+    size = _HEADER.unpack_from(body)[0]
+    pos = _HEADER.size + size
+    header = json.loads(body[_HEADER.size:pos].decode('utf-8'))
+    blobs = []
+    for n in header['blobs']:
+        blobs.append(body[pos:pos + n])
+        pos += n
+    return _unpack(header['data'], blobs)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    # 模块本身只依赖标准库；analyze() 解码结果时才导入pandas和pyarrow，GUI作为瘦客户端时无需加载分析模块
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=300):
+        self.address = address
+        self.timeout = timeout
+
+    def _connection(self):
+        url = urlparse(self.address)
+        if url.scheme == 'unix':
+            return _UnixConnection(url.path, self.timeout)
+        port = url.port if url.port is not None else 8765
+        return http.client.HTTPConnection(url.hostname or '127.0.0.1', port, timeout=self.timeout)
+
+    def _request(self, method, path, payload=None):
+        conn = self._connection()
+        try:
+            body = json.dumps(payload).encode('utf-8') if payload is not None else None
+            conn.request(method, path, body, {'Content-Type': 'application/json'} if body else {})
+            resp = conn.getresponse()
+            data = resp.read()
+            if resp.status != 200:
+                raise RuntimeError(json.loads(data).get('error', f'HTTP {resp.status}'))
+            return resp.getheader('Content-Type', ''), data
+        finally:
+            conn.close()
+
+    def health(self):
+        return json.loads(self._request('GET', '/health')[1])
+
+    def metrics(self, tickers, bench, start, end, strategy='买入持有', cost_bps=5.0, simulation=False,
+                optimize=False):
+        req = {'tickers': tickers, 'bench': bench, 'start': start, 'end': end, 'strategy': strategy,
+               'cost_bps': cost_bps, 'simulation': simulation, 'optimize': optimize}
+        return json.loads(self._request('POST', '/metrics', req)[1])
+
+    def analyze(self, tickers, bench, start, end, strategy='买入持有', cost_bps=5.0, simulation=False,
+                optimize=False, cancel=None, on_frame=None, profiler=None):
+        # 与 AnalysisService.analyze 接口一致；服务端不逐只回报进度，取消只是丢弃结果
+        req = {'tickers': tickers, 'bench': bench, 'start': start, 'end': end, 'strategy': strategy,
+               'cost_bps': cost_bps, 'simulation': simulation, 'optimize': optimize}
+        if profiler is not None:
+            with profiler.span('服务请求'):
+                content_type, body = self._request('POST', '/analyze', req)
+        else:
+            content_type, body = self._request('POST', '/analyze', req)
+        if cancel is not None and cancel.is_set():
+            return None
+        if content_type != RESULT_TYPE:
+            raise RuntimeError(f'分析服务返回了未知格式: {content_type}')
+        return decode_result(body)
@@ -0,0 +1,167 @@
+import os
+import argparse
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from price_store import PriceStore, DEFAULT_ROOT
+from align import aligned_returns
+
+METHODS = {'bootstrap': '块自助法', 'normal': '正态蒙特卡洛'}
+SIM_KEYS = ['var95', 'cvar95', 'dd50', 'dd95']
+HORIZON = 21
+BLOCK = 10
+# 股票分块的大小固定，不随进程数变化，保证同一种子在任意进程数下结果一致
+TICKER_BLOCK = 64
+# 每个路径块生成的随机数个数上限（路径数 x 天数 x 股票数），约束单块内存
+CHUNK_ELEMENTS = 2 ** 21
+
+
+def pack_returns(returns, block=BLOCK):
+    # 每列的有效收益率按原顺序移到顶部，各股票历史长度不同也能放进同一矩阵抽样；
+    # 末尾再接上开头的block-1天，循环取块时不必取模
+    r = np.asarray(returns, dtype='float64')
+    if r.ndim == 1:
+        r = r[:, None]
+    valid = ~np.isnan(r)
+    n = valid.sum(axis=0)
+    order = np.argsort(~valid, axis=0, kind='stable')
+    packed = np.take_along_axis(r, order, axis=0)[:n.max()]
+    packed = np.vstack([packed, np.zeros((block - 1, r.shape[1]))])
+    wrap = np.arange(block - 1)[:, None]
+    cols = np.arange(r.shape[1])
+    packed[n + wrap, cols] = packed[wrap % n, cols]
+    return packed, n
+
+
+def bootstrap_paths(rng, packed, n, n_paths, horizon, block=BLOCK):
+    # 循环块自助法：每段随机起点连续取block天，超出末尾时绕回开头，保留波动聚集和短期自相关
+    # 路径按 (天, 路径, 股票) 排列，后面的累乘沿第0轴进行，内存连续
+    k = packed.shape[1]
+    n_blocks = -(-horizon // block)
+    starts = (rng.random((n_blocks, 1, n_paths, k)) * n).astype('int64')
+    idx = (starts + np.arange(block)[:, None, None]).reshape(n_blocks * block, n_paths, k)[:horizon]
+    return packed[idx, np.arange(k)].astype('float32')
+
+
+def normal_params(packed, n):
+    valid = np.arange(len(packed))[:, None] < n
+    mu = np.where(valid, packed, 0).sum(axis=0) / n
+    sigma = np.sqrt(np.where(valid, (packed - mu) ** 2, 0).sum(axis=0) / (n - 1))
+    return mu, sigma
+
+
+def normal_paths(rng, mu, sigma, n_paths, horizon):
+    r = rng.standard_normal((horizon, n_paths, len(mu)), dtype='float32')
+    r *= sigma.astype('float32')
+    r += mu.astype('float32')
+    return np.maximum(r, -1.0, out=r)
+
+
+def path_stats(r):
+    # 原地累乘求净值和回撤，单精度足以满足月度量级的分位数
+    wealth = np.add(r, 1, out=r)
+    np.cumprod(wealth, axis=0, out=wealth)
+    peak = np.maximum(wealth, 1)
+    np.maximum.accumulate(peak, axis=0, out=peak)
+    np.divide(wealth, peak, out=peak)
+    return wealth[-1] - 1, peak.min(axis=0) - 1
+
+
+def _simulate_block(task):
+    method, packed, n, n_paths, horizon, block, seed, block_id = task
+    k = packed.shape[1]
+    terminal = np.empty((n_paths, k), dtype='float32')
+    max_dd = np.empty((n_paths, k), dtype='float32')
+    chunk = max(1, CHUNK_ELEMENTS // (horizon * k))
+    if method == 'normal':
+        mu, sigma = normal_params(packed, n)
+    for i, lo in enumerate(range(0, n_paths, chunk)):
+        size = min(chunk, n_paths - lo)
+        rng = np.random.default_rng([seed, list(METHODS).index(method), block_id, i])
+        if method == 'bootstrap':
+            r = bootstrap_paths(rng, packed, n, size, horizon, block)
+        else:
+            r = normal_paths(rng, mu, sigma, size, horizon)
+        terminal[lo:lo + size], max_dd[lo:lo + size] = path_stats(r)
+    var95 = np.percentile(terminal, 5, axis=0)
+    tail = terminal <= var95
+    return {
+        'var95': var95,
+        'cvar95': np.where(tail, terminal, 0).sum(axis=0) / tail.sum(axis=0),
+        'dd50': np.median(max_dd, axis=0),
+        'dd95': np.percentile(max_dd, 5, axis=0),
+    }
+
+
+def simulate(returns, methods=tuple(METHODS), n_paths=10000, horizon=HORIZON, block=BLOCK,
+             seed=0, workers=1, min_obs=20, progress=None):
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+    counts = returns.notna().sum()
+    columns = list(counts.index[counts >= min_obs])
+    if not columns:
+        return pd.DataFrame(columns=pd.MultiIndex.from_product([methods, SIM_KEYS]))
+    packed, n = pack_returns(returns[columns], block)
+    tasks = [(method, np.ascontiguousarray(packed[:, j:j + TICKER_BLOCK]), n[j:j + TICKER_BLOCK],
+              n_paths, horizon, block, seed, j // TICKER_BLOCK)
+             for method in methods for j in range(0, len(columns), TICKER_BLOCK)]
+    if workers > 1 and len(tasks) > 1:
+        with Pool(min(workers, len(tasks))) as pool:
+            results = []
+            for res in pool.imap(_simulate_block, tasks):
+                results.append(res)
+                if progress:
+                    progress(len(results), len(tasks))
+    else:
+        results = []
+        for task in tasks:
+            results.append(_simulate_block(task))
+            if progress:
+                progress(len(results), len(tasks))
+
+    out = {}
+    per_method = len(tasks) // max(len(methods), 1)
+    for m_i, method in enumerate(methods):
+        blocks = results[m_i * per_method:(m_i + 1) * per_method]
+        for key in SIM_KEYS:
+            values = np.concatenate([b[key] for b in blocks]) if blocks else []
+            out[(method, key)] = pd.Series(values, index=columns, dtype='float64')
+    return pd.DataFrame(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='块自助法与蒙特卡洛风险模拟')
+    parser.add_argument('--universe', help='股票列表文件')
+    parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    parser.add_argument('--end', help='结束日期 YYYY-MM-DD (不含)')
+    parser.add_argument('--store', default=DEFAULT_ROOT, help='本地价格库目录')
+    parser.add_argument('--method', action='append', choices=list(METHODS), help='模拟方法，可重复，默认全部')
+    parser.add_argument('--paths', type=int, default=100000, help='每只股票的模拟路径数')
+    parser.add_argument('--horizon', type=int, default=HORIZON, help='模拟天数')
+    parser.add_argument('--block', type=int, default=BLOCK, help='自助法的块长度（天）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，相同种子结果可复现')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数')
+    parser.add_argument('--portfolio', action='store_true', help='同时模拟等权组合')
+    parser.add_argument('--out', default='simulation_results.csv', help='结果CSV路径')
+    args = parser.parse_args(argv)
+    # backtest 会引入报告和绘图模块，只在命令行入口导入，GUI和服务经 analysis 引用本模块时不加载
+    from backtest import load_universe, DEFAULT_TICKERS
+
+    tickers = load_universe(args.universe) if args.universe else DEFAULT_TICKERS
+    close = PriceStore(args.store).read_panel(tickers, 'Close', args.start, args.end).dropna(how='all')
+    if close.empty:
+        parser.error('价格库中没有可用数据')
+    returns = aligned_returns(close)
+    if args.portfolio:
+        returns['等权组合'] = returns.mean(axis=1)
+    result = simulate(returns, args.method or tuple(METHODS), args.paths, args.horizon, args.block,
+                      args.seed, args.workers,
+                      progress=lambda done, total: print(f"\r{done}/{total} 块", end='', flush=True))
+    print()
+    result.columns = [f'{method}_{key}' for method, key in result.columns]
+    result.to_csv(args.out)
+    print(result.to_string(float_format=lambda v: f'{v * 100:.2f}%'))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,54 @@
 import os
 os.environ['CURL_CA_BUNDLE'] = ''
 
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.font_manager import FontProperties
+import argparse
 import tkinter as tk
-from tkinter import ttk, messagebox
-import yfinance as yf
-import pandas as pd
-import numpy as np
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
-import seaborn as sns
+import time
+import queue
 import threading
-
-font = FontProperties(fname='/System/Library/Fonts/Supplemental/Songti.ttc')
-
-CHART_TABS = ['收盘价走势', '累计收益率', '最大回撤', '滚动波动率',
-              '收益率分布', '相关性热力图', '风险收益散点图', '均线与布林带', 'Beta与Alpha']
+from profiler import Profiler
+from service_client import ServiceClient
+
+FETCH_WORKERS = 8
+POLL_MS = 50
+PARTIAL_INTERVAL = 0.5
+# 指标面板中紧跟历史VaR/CVaR的模拟列：未来HORIZON个交易日的收益分位数和最大回撤分布
+SIM_FIELDS = [('bootstrap', 'var95'), ('bootstrap', 'cvar95'), ('normal', 'var95'), ('normal', 'cvar95'),
+              ('bootstrap', 'dd50'), ('bootstrap', 'dd95')]
+
+# 以下依赖在窗口显示后由 load_backend 在后台线程导入，启动时只加载Tk和标准库
+plt = FigureCanvasTkAgg = pd = compute_metrics = None
+STRATEGIES = DEFAULT_COST_BPS = HORIZON = CHART_TABS = RENDERERS = None
+
+
+def load_backend(service=None):
+    global plt, FigureCanvasTkAgg, pd, compute_metrics
+    global STRATEGIES, DEFAULT_COST_BPS, HORIZON, CHART_TABS, RENDERERS
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import pandas as pd
+    from metrics import compute_metrics
+    from strategy import STRATEGIES, DEFAULT_COST_BPS
+    from simulation import HORIZON
+    from charts import CHART_TABS, RENDERERS
+    if service:
+        # 瘦客户端：数据下载和分析都交给分析服务，本地不加载下载与分析模块
+        return ServiceClient(service)
+    from service import AnalysisService
+    return AnalysisService(workers=FETCH_WORKERS, sim_workers=os.cpu_count() or 1)
 
 
 class StockApp:
-    def __init__(self, root):
+    def __init__(self, root, service=None):
         self.root = root
         self.root.title('股票可视化对比工具')
         self.root.geometry('1400x900')
+        self.service = service
+        self.backend = None
 
         top = ttk.Frame(root, padding=10)
         top.pack(fill=tk.X)
@@ -50,10 +73,30 @@ class StockApp:
         self.end_entry.pack(side=tk.LEFT, padx=3)
         self.end_entry.insert(0, datetime.today().strftime('%Y-%m-%d'))
 
-        self.btn = ttk.Button(top, text='开始分析', command=self.run)
-        self.btn.pack(side=tk.LEFT, padx=15)
-
-        self.status = ttk.Label(top, text='')
+        ttk.Label(top, text='策略:').pack(side=tk.LEFT, padx=(10, 0))
+        self.strategy_box = ttk.Combobox(top, values=['买入持有'], state='readonly', width=10)
+        self.strategy_box.pack(side=tk.LEFT, padx=3)
+        self.strategy_box.set('买入持有')
+
+        ttk.Label(top, text='费率(bp):').pack(side=tk.LEFT, padx=(10, 0))
+        self.cost_entry = ttk.Entry(top, width=5)
+        self.cost_entry.pack(side=tk.LEFT, padx=3)
+
+        self.btn = ttk.Button(top, text='开始分析', command=self.run, state='disabled')
+        self.btn.pack(side=tk.LEFT, padx=(15, 3))
+        self.cancel_btn = ttk.Button(top, text='取消', command=self.cancel, state='disabled')
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 15))
+
+        # 风险模拟和组合优化较慢，勾选后才计算；未勾选时模拟列留空，散点图不画有效前沿
+        self.sim_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text='风险模拟', variable=self.sim_var).pack(side=tk.LEFT)
+        self.optimize_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text='组合优化', variable=self.optimize_var).pack(side=tk.LEFT)
+        self.memory_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text='内存分析', variable=self.memory_var).pack(side=tk.LEFT)
+        ttk.Button(top, text='导出性能', command=self.export_profile).pack(side=tk.LEFT, padx=5)
+
+        self.status = ttk.Label(top, text='正在加载...')
         self.status.pack(side=tk.LEFT, padx=10)
 
         self.notebook = ttk.Notebook(root)
@@ -61,6 +104,28 @@ class StockApp:
 
         self.figures = {}
         self.canvases = {}
+        self._data = None
+        self._rendered = set()
+        self._profiler = None
+        self._queue = queue.Queue()
+        self._run_id = 0
+        self._cancel = None
+        self._partial = None
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+        threading.Thread(target=self._load, daemon=True).start()
+        self.root.after(POLL_MS, self._poll)
+
+    def _load(self):
+        try:
+            self._queue.put((None, 'ready', load_backend(self.service)))
+        except Exception as e:
+            self._queue.put((None, 'fatal', f'{type(e).__name__}: {e}'))
+
+    def _on_ready(self, backend):
+        self.backend = backend
+        self.strategy_box.config(values=list(STRATEGIES))
+        if not self.cost_entry.get().strip():
+            self.cost_entry.insert(0, f'{DEFAULT_COST_BPS:g}')
         for name in CHART_TABS:
             frame = ttk.Frame(self.notebook)
             self.notebook.add(frame, text=name)
@@ -72,23 +137,29 @@ class StockApp:
 
         stats_frame = ttk.Frame(self.notebook)
         self.notebook.add(stats_frame, text='指标面板')
+        sim_cols = (f'自助VaR({HORIZON}日)%', f'自助CVaR({HORIZON}日)%', f'正态VaR({HORIZON}日)%',
+                    f'正态CVaR({HORIZON}日)%', '模拟回撤中位%', '模拟回撤95%')
         cols = ('股票', '总收益率%', '年化收益率%', '年化波动率%', '夏普比率',
                 '索提诺比率', 'Calmar比率', '最大回撤%', '最大回撤日期',
-                'VaR(95%)%', 'CVaR(95%)%', 'Beta', 'Alpha%')
+                'VaR(95%)%', 'CVaR(95%)%', *sim_cols, 'Beta', 'Alpha%')
         self.tree = ttk.Treeview(stats_frame, columns=cols, show='headings', height=15)
         for c in cols:
             self.tree.heading(c, text=c)
             self.tree.column(c, width=95, anchor=tk.CENTER)
         self.tree.column('股票', width=70)
         self.tree.column('最大回撤日期', width=110)
+        for c in sim_cols:
+            self.tree.column(c, width=105)
         scrollbar = ttk.Scrollbar(stats_frame, orient=tk.VERTICAL, command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar.set)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.btn.config(state='normal')
+        self.status.config(text=f'已连接分析服务 {self.service}' if self.service else '')
 
     def run(self):
         raw = self.ticker_entry.get().strip()
-        tickers = [t.strip().upper() for t in raw.replace('，', ',').split(',') if t.strip()]
+        tickers = list(dict.fromkeys(t.strip().upper() for t in raw.replace('，', ',').split(',') if t.strip()))
         bench = self.bench_entry.get().strip().upper()
         start = self.start_entry.get().strip()
         end = self.end_entry.get().strip()
@@ -101,268 +172,151 @@ class StockApp:
         except ValueError:
             messagebox.showerror('错误', '日期格式应为 YYYY-MM-DD')
             return
-        self.btn.config(state='disabled')
+        strategy = self.strategy_box.get()
+        try:
+            cost_bps = float(self.cost_entry.get().strip())
+        except ValueError:
+            messagebox.showerror('错误', '费率应为数字')
+            return
+        self.cancel()
+        self._run_id += 1
+        self._cancel = threading.Event()
+        self._data = None
+        self._partial = {'tickers': tickers, 'bench': bench, 'frames': {}, 'stats': {},
+                         'dirty': False, 'shown_at': 0.0}
+        # 上一次运行的图表和指标表立即清空，新数据逐只到达后重新绘制，不与新输入混在一起显示
+        for name, fig in self.figures.items():
+            if fig.axes:
+                fig.clear()
+                self.canvases[name].draw_idle()
+        self._rendered.clear()
+        self.tree.delete(*self.tree.get_children())
+        self.cancel_btn.config(state='normal')
         self.status.config(text='正在获取数据...')
-        threading.Thread(target=self._fetch, args=(tickers, bench, start, end), daemon=True).start()
-
-    def _fetch(self, tickers, bench, start, end):
+        profiler = Profiler(memory=self.memory_var.get())
+        threading.Thread(target=self._fetch, args=(self._run_id, self._cancel, tickers, bench, start, end,
+                                                   strategy, cost_bps, profiler, self.sim_var.get(),
+                                                   self.optimize_var.get()),
+                         daemon=True).start()
+
+    def cancel(self):
+        if self._cancel is not None and not self._cancel.is_set():
+            self._cancel.set()
+            self.status.config(text='已取消')
+        self.cancel_btn.config(state='disabled')
+
+    def _fetch(self, run_id, cancel, tickers, bench, start, end, strategy, cost_bps, profiler=None,
+               simulation=False, optimize=False):
+        # 后台线程只往队列里放消息，所有界面更新都在Tk主循环的 _poll 中完成
+        profiler = profiler or Profiler()
+        data = None
         try:
-            all_tickers = tickers + [bench]
-            close_data = pd.DataFrame()
-            volume_data = pd.DataFrame()
-            high_data = pd.DataFrame()
-            low_data = pd.DataFrame()
-            failed = []
-            for t in all_tickers:
-                df = yf.download(t, start=start, end=end, progress=False)
-                if df.empty:
-                    failed.append(t)
-                    continue
-                if isinstance(df.columns, pd.MultiIndex):
-                    close_data[t] = df[('Close', t)]
-                    volume_data[t] = df[('Volume', t)]
-                    high_data[t] = df[('High', t)]
-                    low_data[t] = df[('Low', t)]
-                else:
-                    close_data[t] = df['Close']
-                    volume_data[t] = df['Volume']
-                    high_data[t] = df['High']
-                    low_data[t] = df['Low']
-            if close_data.empty or not any(t in close_data.columns for t in tickers):
-                self.root.after(0, lambda: messagebox.showerror('错误', '股票数据获取失败'))
+            data = self.backend.analyze(tickers, bench, start, end, strategy, cost_bps, simulation, optimize,
+                                        cancel=cancel,
+                                        on_frame=lambda *frame: self._queue.put((run_id, 'frame', frame)),
+                                        profiler=profiler)
+            if cancel.is_set() or data is None:
                 return
-            close_data = close_data.dropna()
-            high_data = high_data.reindex(close_data.index).dropna()
-            low_data = low_data.reindex(close_data.index).dropna()
-            volume_data = volume_data.reindex(close_data.index).dropna()
-            stock_cols = [t for t in tickers if t in close_data.columns]
-            has_bench = bench in close_data.columns
-            daily_returns = close_data.pct_change().dropna()
-            cum_ret = (1 + daily_returns).cumprod() - 1
-            roll_vol = daily_returns[stock_cols].rolling(window=30).std() * np.sqrt(252)
-            corr = daily_returns[stock_cols].corr()
-
-            drawdowns = pd.DataFrame()
-            for t in stock_cols:
-                peak = close_data[t].cummax()
-                drawdowns[t] = (close_data[t] - peak) / peak
-
-            trading_days = len(daily_returns)
-            stats = {}
-            for t in stock_cols:
-                ret_t = daily_returns[t]
-                total_ret = close_data[t].iloc[-1] / close_data[t].iloc[0] - 1
-                ann_ret = (1 + total_ret) ** (252 / trading_days) - 1
-                ann_vol = ret_t.std() * np.sqrt(252)
-                sharpe = ann_ret / ann_vol if ann_vol != 0 else 0
-                downside = ret_t[ret_t < 0].std() * np.sqrt(252)
-                sortino = ann_ret / downside if downside != 0 else 0
-                max_dd = drawdowns[t].min()
-                max_dd_date = drawdowns[t].idxmin().strftime('%Y-%m-%d')
-                calmar = ann_ret / abs(max_dd) if max_dd != 0 else 0
-                var_95 = np.percentile(ret_t, 5)
-                cvar_95 = ret_t[ret_t <= var_95].mean()
-                beta, alpha = 0.0, 0.0
-                if has_bench:
-                    cov = np.cov(ret_t, daily_returns[bench])
-                    beta = cov[0, 1] / cov[1, 1] if cov[1, 1] != 0 else 0
-                    bench_ann = (1 + (close_data[bench].iloc[-1] / close_data[bench].iloc[0] - 1)) ** (252 / trading_days) - 1
-                    alpha = ann_ret - beta * bench_ann
-                stats[t] = {
-                    'total_ret': total_ret, 'ann_ret': ann_ret, 'ann_vol': ann_vol,
-                    'sharpe': sharpe, 'sortino': sortino, 'calmar': calmar,
-                    'max_dd': max_dd, 'max_dd_date': max_dd_date,
-                    'var95': var_95, 'cvar95': cvar_95,
-                    'beta': beta, 'alpha': alpha
-                }
-
-            data = {
-                'close': close_data, 'high': high_data, 'low': low_data,
-                'volume': volume_data, 'daily_returns': daily_returns,
-                'cum_ret': cum_ret, 'roll_vol': roll_vol, 'corr': corr,
-                'drawdowns': drawdowns, 'stats': stats,
-                'stock_cols': stock_cols, 'bench': bench,
-                'has_bench': has_bench, 'failed': failed
-            }
-            self.root.after(0, lambda: self._plot(data))
+            data['profiler'] = profiler
+            self._queue.put((run_id, 'data', data))
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror('错误', str(e)))
+            self._queue.put((run_id, 'error', str(e)))
         finally:
-            self.root.after(0, lambda: self.btn.config(state='normal'))
+            # 成功时由 _plot 在首屏渲染后关闭；取消或出错时在这里停止内存跟踪
+            if cancel.is_set() or data is None:
+                profiler.close()
 
-    def _plot(self, d):
-        close = d['close']
-        stock_cols = d['stock_cols']
-        cum_ret = d['cum_ret']
-        roll_vol = d['roll_vol']
-        corr = d['corr']
-        drawdowns = d['drawdowns']
-        stats = d['stats']
-        daily_returns = d['daily_returns']
-        bench = d['bench']
-        has_bench = d['has_bench']
-
-        fig = self.figures['收盘价走势']
-        fig.clear()
-        ax = fig.add_subplot(111)
-        for t in stock_cols:
-            ax.plot(close.index, close[t], label=t)
-        if has_bench:
-            ax.plot(close.index, close[bench], label=bench, linestyle='--', color='gray', alpha=0.7)
-        ax.set_title('收盘价走势', fontproperties=font, fontsize=14)
-        ax.set_xlabel('日期', fontproperties=font)
-        ax.set_ylabel('价格 (USD)', fontproperties=font)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        fig.tight_layout()
-        self.canvases['收盘价走势'].draw()
-
-        fig = self.figures['累计收益率']
-        fig.clear()
-        ax = fig.add_subplot(111)
-        for t in stock_cols:
-            ax.plot(cum_ret.index, cum_ret[t] * 100, label=t)
-        if has_bench:
-            ax.plot(cum_ret.index, cum_ret[bench] * 100, label=bench, linestyle='--', color='gray', alpha=0.7)
-        ax.set_title('累计收益率', fontproperties=font, fontsize=14)
-        ax.set_xlabel('日期', fontproperties=font)
-        ax.set_ylabel('累计收益率 (%)', fontproperties=font)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        fig.tight_layout()
-        self.canvases['累计收益率'].draw()
-
-        fig = self.figures['最大回撤']
-        fig.clear()
-        ax = fig.add_subplot(111)
-        for t in stock_cols:
-            ax.plot(drawdowns.index, drawdowns[t] * 100, label=t)
-        ax.set_title('最大回撤', fontproperties=font, fontsize=14)
-        ax.set_xlabel('日期', fontproperties=font)
-        ax.set_ylabel('回撤 (%)', fontproperties=font)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        fig.tight_layout()
-        self.canvases['最大回撤'].draw()
-
-        fig = self.figures['滚动波动率']
-        fig.clear()
-        ax = fig.add_subplot(111)
+    def _poll(self):
+        try:
+            while True:
+                run_id, kind, payload = self._queue.get_nowait()
+                if kind == 'ready':
+                    self._on_ready(payload)
+                    continue
+                if kind == 'fatal':
+                    self.status.config(text='加载失败')
+                    messagebox.showerror('错误', payload)
+                    continue
+                if run_id != self._run_id or self._cancel.is_set():
+                    continue
+                if kind == 'frame':
+                    self._on_frame(*payload)
+                elif kind == 'data':
+                    self.cancel_btn.config(state='disabled')
+                    self._partial = None
+                    self._plot(payload)
+                elif kind == 'error':
+                    self.cancel_btn.config(state='disabled')
+                    self._partial = None
+                    self.status.config(text='')
+                    messagebox.showerror('错误', payload)
+        except queue.Empty:
+            pass
+        p = self._partial
+        if p is not None and p['dirty'] and time.monotonic() - p['shown_at'] >= PARTIAL_INTERVAL:
+            self._show_partial()
+        self.root.after(POLL_MS, self._poll)
+
+    def _on_frame(self, symbol, df, done, total):
+        p = self._partial
+        if df is not None:
+            p['frames'][symbol] = df
+            p['dirty'] = True
+            if symbol == p['bench']:
+                p['stats'].clear()
+        self.status.config(text=f"正在获取数据... {done}/{total}")
+
+    def _show_partial(self):
+        # 数据未取齐前只更新收盘价走势和指标面板；每只股票用自己的区间计算指标，最终结果到达后整体替换
+        p = self._partial
+        p['dirty'] = False
+        p['shown_at'] = time.monotonic()
+        frames, bench = p['frames'], p['bench']
+        stock_cols = [t for t in p['tickers'] if t in frames]
+        if not stock_cols:
+            return
+        has_bench = bench in frames
+        close = pd.concat({t: frames[t]['Close'] for t in stock_cols + ([bench] if has_bench else [])}, axis=1)
+        bench_ret = close[bench].pct_change() if has_bench else None
         for t in stock_cols:
-            ax.plot(roll_vol.index, roll_vol[t] * 100, label=t)
-        ax.set_title('30日滚动年化波动率', fontproperties=font, fontsize=14)
-        ax.set_xlabel('日期', fontproperties=font)
-        ax.set_ylabel('波动率 (%)', fontproperties=font)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        fig.tight_layout()
-        self.canvases['滚动波动率'].draw()
-
-        fig = self.figures['收益率分布']
-        fig.clear()
-        n = len(stock_cols)
-        ncols = min(n, 3)
-        nrows = (n + ncols - 1) // ncols
-        for i, t in enumerate(stock_cols):
-            ax = fig.add_subplot(nrows, ncols, i + 1)
-            ret = daily_returns[t]
-            ax.hist(ret, bins=50, alpha=0.7, edgecolor='black', density=True)
-            x = np.linspace(ret.min(), ret.max(), 200)
-            ax.plot(x, (1 / (ret.std() * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((x - ret.mean()) / ret.std()) ** 2),
-                    'r-', linewidth=1.5)
-            ax.set_title(f'{t}', fontsize=11)
-            ax.set_xlabel('收益率', fontproperties=font, fontsize=9)
-            ax.axvline(np.percentile(ret, 5), color='orange', linestyle='--', linewidth=1)
-        fig.suptitle('每日收益率分布 (橙线=VaR 95%)', fontproperties=font, fontsize=13)
-        fig.tight_layout()
-        self.canvases['收益率分布'].draw()
-
-        fig = self.figures['相关性热力图']
-        fig.clear()
-        ax = fig.add_subplot(111)
-        sns.heatmap(corr, annot=True, fmt='.3f', cmap='RdYlGn', ax=ax, vmin=-1, vmax=1)
-        ax.set_title('收益率相关性热力图', fontproperties=font, fontsize=14)
-        fig.tight_layout()
-        self.canvases['相关性热力图'].draw()
-
-        fig = self.figures['风险收益散点图']
-        fig.clear()
-        ax = fig.add_subplot(111)
-        colors = plt.cm.tab10(np.linspace(0, 1, len(stock_cols)))
-        for i, t in enumerate(stock_cols):
-            s = stats[t]
-            ax.scatter(s['ann_vol'] * 100, s['ann_ret'] * 100, s=120, color=colors[i], zorder=5)
-            ax.annotate(t, (s['ann_vol'] * 100, s['ann_ret'] * 100), fontsize=11,
-                        xytext=(8, 5), textcoords='offset points')
-        if has_bench:
-            b_ret = (close[bench].iloc[-1] / close[bench].iloc[0] - 1)
-            b_ann = (1 + b_ret) ** (252 / len(daily_returns)) - 1
-            b_vol = daily_returns[bench].std() * np.sqrt(252)
-            ax.scatter(b_vol * 100, b_ann * 100, s=120, marker='D', color='gray', zorder=5)
-            ax.annotate(bench, (b_vol * 100, b_ann * 100), fontsize=11,
-                        xytext=(8, 5), textcoords='offset points')
-        ax.set_title('风险收益散点图', fontproperties=font, fontsize=14)
-        ax.set_xlabel('年化波动率 (%)', fontproperties=font)
-        ax.set_ylabel('年化收益率 (%)', fontproperties=font)
-        ax.grid(True, alpha=0.3)
-        fig.tight_layout()
-        self.canvases['风险收益散点图'].draw()
-
-        fig = self.figures['均线与布林带']
-        fig.clear()
-        n = len(stock_cols)
-        ncols = min(n, 2)
-        nrows = (n + ncols - 1) // ncols
-        for i, t in enumerate(stock_cols):
-            ax = fig.add_subplot(nrows, ncols, i + 1)
-            c = close[t]
-            ma20 = c.rolling(20).mean()
-            ma60 = c.rolling(60).mean()
-            std20 = c.rolling(20).std()
-            upper = ma20 + 2 * std20
-            lower = ma20 - 2 * std20
-            ax.plot(c.index, c, label='Close', linewidth=0.8)
-            ax.plot(c.index, ma20, label='MA20', linewidth=0.8)
-            ax.plot(c.index, ma60, label='MA60', linewidth=0.8)
-            ax.fill_between(c.index, upper, lower, alpha=0.15, color='blue')
-            ax.set_title(f'{t}', fontsize=11)
-            ax.legend(fontsize=7)
-            ax.grid(True, alpha=0.3)
-        fig.suptitle('均线与布林带 (MA20/MA60/BB20)', fontproperties=font, fontsize=13)
-        fig.tight_layout()
-        self.canvases['均线与布林带'].draw()
-
-        fig = self.figures['Beta与Alpha']
-        fig.clear()
-        if has_bench and len(stock_cols) > 0:
-            ax1 = fig.add_subplot(121)
-            betas = [stats[t]['beta'] for t in stock_cols]
-            bars1 = ax1.barh(stock_cols, betas, color=plt.cm.tab10(np.linspace(0, 1, len(stock_cols))))
-            ax1.axvline(1.0, color='red', linestyle='--', linewidth=1)
-            ax1.set_title('Beta (vs ' + bench + ')', fontproperties=font, fontsize=13)
-            ax1.set_xlabel('Beta', fontproperties=font)
-            for bar, val in zip(bars1, betas):
-                ax1.text(bar.get_width() + 0.02, bar.get_y() + bar.get_height() / 2,
-                         f'{val:.3f}', va='center', fontsize=10)
-            ax1.grid(True, alpha=0.3, axis='x')
-
-            ax2 = fig.add_subplot(122)
-            alphas = [stats[t]['alpha'] * 100 for t in stock_cols]
-            bars2 = ax2.barh(stock_cols, alphas, color=plt.cm.tab10(np.linspace(0, 1, len(stock_cols))))
-            ax2.axvline(0, color='red', linestyle='--', linewidth=1)
-            ax2.set_title('Alpha (vs ' + bench + ')', fontproperties=font, fontsize=13)
-            ax2.set_xlabel('Alpha (%)', fontproperties=font)
-            for bar, val in zip(bars2, alphas):
-                ax2.text(bar.get_width() + 0.2, bar.get_y() + bar.get_height() / 2,
-                         f'{val:.2f}%', va='center', fontsize=10)
-            ax2.grid(True, alpha=0.3, axis='x')
-        fig.tight_layout()
-        self.canvases['Beta与Alpha'].draw()
+            if t in p['stats']:
+                continue
+            ret = close[t].dropna().pct_change().dropna()
+            b = bench_ret.reindex(ret.index) if bench_ret is not None else None
+            if len(ret) > 2:
+                p['stats'][t] = compute_metrics(ret.to_frame(t), b).iloc[0].to_dict()
+        name = '收盘价走势'
+        RENDERERS[name](self.figures[name], {'close': close, 'stock_cols': stock_cols,
+                                              'bench': bench, 'has_bench': has_bench})
+        self.canvases[name].draw_idle()
+        self._fill_table([t for t in stock_cols if t in p['stats']], p['stats'])
+
+    def _on_tab_changed(self, event=None):
+        name = self.notebook.tab(self.notebook.select(), 'text')
+        if self._data is None or name not in RENDERERS or name in self._rendered:
+            return
+        with self._profiler.span(f'渲染:{name}'):
+            RENDERERS[name](self.figures[name], self._data)
+            self.canvases[name].draw()
+        self._rendered.add(name)
+
+    def export_profile(self):
+        if self._profiler is None:
+            messagebox.showinfo('提示', '请先运行一次分析')
+            return
+        path = filedialog.asksaveasfilename(defaultextension='.json', initialfile='profile.json',
+                                            filetypes=[('Chrome trace JSON', '*.json')])
+        if path:
+            self._profiler.write(path)
 
+    def _fill_table(self, stock_cols, stats, sim=None):
         for row in self.tree.get_children():
             self.tree.delete(row)
         for t in stock_cols:
             s = stats[t]
+            simulated = ['' for _ in SIM_FIELDS]
+            if sim is not None and t in sim.index:
+                simulated = [f"{sim.loc[t, key]*100:.2f}" for key in SIM_FIELDS]
             self.tree.insert('', tk.END, values=(
                 t,
                 f"{s['total_ret']*100:.2f}",
@@ -375,15 +329,34 @@ class StockApp:
                 s['max_dd_date'],
                 f"{s['var95']*100:.2f}",
                 f"{s['cvar95']*100:.2f}",
+                *simulated,
                 f"{s['beta']:.3f}",
                 f"{s['alpha']*100:.2f}"
             ))
 
+    def _plot(self, d):
+        self._data = d
+        self._profiler = d['profiler']
+        self._rendered.clear()
+        self._on_tab_changed()
+        stock_cols = d['stock_cols']
+        with self._profiler.span('指标表'):
+            self._fill_table(stock_cols + d['portfolios'], d['stats'], d['sim'])
+        self._profiler.close()
+
         msg = f"获取失败: {', '.join(d['failed'])}" if d['failed'] else ''
-        self.status.config(text=f"完成 ({len(stock_cols)}只股票, {len(close)}交易日) {msg}")
+        if d.get('memo_hits'):
+            msg += f" 内存缓存命中 {d['memo_hits']}只"
+        self.status.config(text=f"完成 ({d['strategy']}, {len(stock_cols)}只股票, {len(d['close'])}交易日) "
+                                f"{msg} | {self._profiler.summary()}")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='股票可视化对比工具')
+    parser.add_argument('--service', default=os.environ.get('STOCK_SERVICE'),
+                        help='分析服务地址，如 http://127.0.0.1:8765 或 unix:/tmp/stock_service.sock；'
+                             '不指定则在本进程内下载和计算')
+    args = parser.parse_args()
     root = tk.Tk()
-    app = StockApp(root)
+    app = StockApp(root, args.service)
     root.mainloop()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from rolling import window_sum
+
+DEFAULT_COST_BPS = 5.0
+
+
+def _as_2d(values):
+    x = np.asarray(values, dtype='float64')
+    return x[:, None] if x.ndim == 1 else x
+
+
+def sma(values, window):
+    return window_sum(_as_2d(values), window) / window
+
+
+def rolling_std(values, window):
+    x = _as_2d(values)
+    s, sq = window_sum(x, window), window_sum(x * x, window)
+    return np.sqrt(np.maximum(sq - s * s / window, 0) / (window - 1))
+
+
+def indicator(values, fn, window, cache=None):
+    # 窗口长度用于切片，命令行和参数网格传入的浮点数在这里统一转成整数
+    window = int(window)
+    if cache is None:
+        return fn(values, window)
+    key = (fn.__name__, window)
+    if key not in cache:
+        cache[key] = fn(values, window)
+    return cache[key]
+
+
+def bollinger(values, window=20, k=2.0, cache=None):
+    mid = indicator(values, sma, window, cache)
+    band = k * indicator(values, rolling_std, window, cache)
+    return mid, mid + band, mid - band
+
+
+def ffill(values):
+    x = _as_2d(values)
+    idx = np.where(np.isnan(x), 0, np.arange(len(x))[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return x[idx, np.arange(x.shape[1])]
+
+
+def buy_hold(close, cache=None):
+    return np.where(np.isnan(_as_2d(close)), 0.0, 1.0)
+
+
+def ma_cross(close, short=20, long=60, cache=None):
+    fast, slow = indicator(close, sma, short, cache), indicator(close, sma, long, cache)
+    return np.where(np.isnan(slow), 0.0, (fast > slow).astype('float64'))
+
+
+def bollinger_revert(close, window=20, k=2.0, cache=None):
+    c = _as_2d(close)
+    mid, _, lower = bollinger(c, int(window), float(k), cache)
+    signal = np.where(c < lower, 1.0, np.where(c > mid, 0.0, np.nan))
+    return np.nan_to_num(ffill(signal))
+
+
+STRATEGIES = {
+    '买入持有': buy_hold,
+    '均线交叉': ma_cross,
+    '布林带回归': bollinger_revert,
+}
+
+STRATEGY_ALIASES = {'buy_hold': '买入持有', 'ma_cross': '均线交叉', 'bollinger': '布林带回归'}
+
+
+def backtest(close, positions, cost_bps=DEFAULT_COST_BPS):
+    c = _as_2d(close)
+    pos = np.nan_to_num(_as_2d(positions))
+    held = np.vstack([np.zeros((1, pos.shape[1])), pos[:-1]])
+    turnover = np.abs(np.diff(held, axis=0, prepend=0))
+    costs = turnover * cost_bps / 1e4
+    filled = ffill(c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        asset_ret = np.nan_to_num(filled[1:] / filled[:-1] - 1)
+    # 未上市、停牌或退市的K线收益记为NaN，复牌后第一根K线的收益跨越整个缺口
+    missing = np.isnan(c[1:]) | np.isnan(filled[:-1])
+    strat_ret = np.where(missing, np.nan, held[1:] * asset_ret - costs[1:])
+    equity = np.vstack([np.ones((1, c.shape[1])), np.cumprod(1 + np.nan_to_num(strat_ret), axis=0)])
+    result = {'positions': pos, 'turnover': turnover, 'costs': costs, 'returns': strat_ret, 'equity': equity}
+    if isinstance(close, pd.DataFrame):
+        for key, value in result.items():
+            index = close.index[1:] if key == 'returns' else close.index
+            result[key] = pd.DataFrame(value, index=index, columns=close.columns)
+    return result
+
+
+def run_strategy(close, strategy, cost_bps=DEFAULT_COST_BPS, **params):
+    fn = STRATEGIES[STRATEGY_ALIASES.get(strategy, strategy)] if isinstance(strategy, str) else strategy
+    filled = ffill(close)
+    if isinstance(close, pd.DataFrame):
+        filled = pd.DataFrame(filled, index=close.index, columns=close.columns)
+    return backtest(close, fn(filled, **params), cost_bps)
+
+
+def parse_params(items):
+    params = {}
+    for item in items or []:
+        key, value = item.split('=', 1)
+        value = float(value)
+        params[key.strip()] = int(value) if value.is_integer() else value
+    return params
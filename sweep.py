@@ -0,0 +1,134 @@
+import os
+import argparse
+import itertools
+from collections import OrderedDict
+from multiprocessing import Pool, shared_memory
+import numpy as np
+import pandas as pd
+from price_store import PriceStore, DEFAULT_ROOT
+from metrics import compute_metrics
+from strategy import STRATEGIES, STRATEGY_ALIASES, backtest, ffill
+from backtest import load_universe, DEFAULT_TICKERS
+
+RANK_KEYS = ['sharpe', 'calmar', 'max_dd', 'ann_ret', 'ann_vol']
+RANK_BY = ['sharpe', 'calmar', 'max_dd', 'worst_dd', 'ann_ret']
+INDICATOR_CACHE_SIZE = 64
+
+_close = None
+_filled = None
+_shm = None
+_cache = None
+
+
+class _LRU(OrderedDict):
+    def __getitem__(self, key):
+        self.move_to_end(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > INDICATOR_CACHE_SIZE:
+            self.popitem(last=False)
+
+
+def _attach(name, shape, dtype):
+    global _close, _filled, _shm, _cache
+    _shm = shared_memory.SharedMemory(name=name)
+    _close = np.ndarray(shape, dtype=dtype, buffer=_shm.buf)
+    _filled = ffill(_close)
+    _cache = _LRU()
+
+
+def _run_chunk(task):
+    strategy, combos, cost_bps = task
+    fn = STRATEGIES[STRATEGY_ALIASES.get(strategy, strategy)]
+    rows = []
+    for params in combos:
+        result = backtest(_close, fn(_filled, cache=_cache, **params), cost_bps)
+        m = compute_metrics(result['returns'])
+        row = dict(params)
+        row.update({k: float(m[k].mean()) for k in RANK_KEYS})
+        row['worst_dd'] = float(m['max_dd'].min())
+        row['turnover'] = float(result['turnover'].sum(axis=0).mean())
+        rows.append(row)
+    return rows
+
+
+def parse_grid(items):
+    grid = {}
+    for item in items:
+        key, spec = item.split('=', 1)
+        if ':' in spec:
+            start, stop, step = (float(v) for v in spec.split(':'))
+            values = np.arange(start, stop + step / 2, step)
+        else:
+            values = [float(v) for v in spec.split(',')]
+        grid[key.strip()] = [int(v) if float(v).is_integer() else float(v) for v in values]
+    return grid
+
+
+def combinations(grid, strategy):
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    if STRATEGY_ALIASES.get(strategy, strategy) == '均线交叉':
+        combos = [c for c in combos if c.get('short', 20) < c.get('long', 60)]
+    # 相邻组合共享窗口参数，按参数排序后分块可让同一进程复用滚动指标
+    return sorted(combos, key=lambda c: tuple(c[k] for k in keys))
+
+
+def run_sweep(close, strategy, grid, cost_bps=0.0, workers=None, chunk_size=32, rank_by='sharpe', progress=None):
+    values = np.ascontiguousarray(close, dtype='float64')
+    combos = combinations(grid, strategy)
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        rows = []
+        with Pool(workers, initializer=_attach, initargs=(shm.name, values.shape, values.dtype)) as pool:
+            for i, chunk_rows in enumerate(pool.imap_unordered(_run_chunk, [(strategy, c, cost_bps) for c in chunks])):
+                rows.extend(chunk_rows)
+                if progress:
+                    progress(i + 1, len(chunks), rows)
+    finally:
+        shm.close()
+        shm.unlink()
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values(rank_by, ascending=False).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='策略参数网格扫描')
+    parser.add_argument('--universe', help='股票列表文件')
+    parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    parser.add_argument('--end', help='结束日期 YYYY-MM-DD (不含)')
+    parser.add_argument('--store', default=DEFAULT_ROOT, help='本地价格库目录')
+    parser.add_argument('--strategy', default='ma_cross', choices=list(STRATEGY_ALIASES) + list(STRATEGIES))
+    parser.add_argument('--grid', action='append', required=True,
+                        help='参数网格，如 --grid short=5:50:5 --grid long=20:200:10 或 --grid k=1.5,2,2.5')
+    parser.add_argument('--cost-bps', type=float, default=0.0, help='单边交易费率 (bp)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数')
+    parser.add_argument('--rank-by', default='sharpe', choices=RANK_BY, help='排序指标')
+    parser.add_argument('--out', default='sweep_results.csv', help='结果CSV路径')
+    parser.add_argument('--top', type=int, default=10, help='打印前N名')
+    args = parser.parse_args(argv)
+
+    tickers = load_universe(args.universe) if args.universe else DEFAULT_TICKERS
+    close = PriceStore(args.store).read_panel(tickers, 'Close', args.start, args.end).dropna(how='all')
+    if close.empty:
+        parser.error('价格库中没有可用数据')
+
+    def progress(done, total, rows):
+        best = max(r[args.rank_by] for r in rows)
+        print(f"\r{done}/{total} 块, {len(rows)} 组参数, 当前最优 {args.rank_by}={best:.4f}", end='', flush=True)
+
+    result = run_sweep(close, args.strategy, parse_grid(args.grid), args.cost_bps, args.workers,
+                       rank_by=args.rank_by, progress=progress)
+    print()
+    result.to_csv(args.out, index=False)
+    print(result.head(args.top).to_string())
+
+
+if __name__ == '__main__':
+    main()
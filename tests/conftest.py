@@ -0,0 +1,31 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import synthetic_ohlcv
+from price_store import PriceStore
+
+
+@pytest.fixture(scope='session')
+def frames():
+    return synthetic_ohlcv(4, 2, seed=1)
+
+
+@pytest.fixture(scope='session')
+def returns():
+    # 无缺失的日收益率矩阵，用于和 pandas 的参考实现逐项对比
+    rng = np.random.default_rng(7)
+    index = pd.bdate_range(end='2024-12-31', periods=500, name='Date')
+    return pd.DataFrame(rng.normal(4e-4, 0.015, (500, 6)), index=index, columns=[f'S{i:05d}' for i in range(6)])
+
+
+@pytest.fixture
+def store(tmp_path, frames):
+    store = PriceStore(str(tmp_path / 'store'))
+    for symbol, df in frames.items():
+        store.write(symbol, df)
+    return store
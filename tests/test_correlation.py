@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from correlation import cluster_order, corr_matrix, rolling_corr
+
+
+def test_corr_matrix_matches_pandas(returns):
+    expected = returns.corr()
+    for block in (2, 1024):
+        got = corr_matrix(returns, block=block)
+        assert got.dtypes.eq(np.float32).all()
+        pd.testing.assert_frame_equal(got.astype('float64'), expected, atol=1e-5)
+    np.testing.assert_allclose(corr_matrix(returns, dtype=np.float64), expected, atol=1e-12)
+
+
+def test_corr_matrix_constant_column_is_nan(returns):
+    r = returns.copy()
+    r['S00000'] = 0.0
+    got = corr_matrix(r)
+    assert got['S00000'].isna().all() and got.loc['S00000'].isna().all()
+    pd.testing.assert_frame_equal(got.iloc[1:, 1:].astype('float64'), r.iloc[:, 1:].corr(), atol=1e-5)
+
+
+def test_cluster_order_groups_correlated_columns(returns):
+    pytest.importorskip('scipy')
+    factor = returns.iloc[:, :2].to_numpy()
+    r = pd.DataFrame({f'S{i}': factor[:, i % 2] + 0.2 * returns.iloc[:, i].to_numpy() for i in range(6)})
+    order = list(cluster_order(corr_matrix(r)))
+    assert sorted(order) == list(range(6))
+    assert {frozenset(order[:3]), frozenset(order[3:])} == {frozenset({0, 2, 4}), frozenset({1, 3, 5})}
+
+
+def test_rolling_corr_matches_pandas(returns):
+    bench = returns.mean(axis=1)
+    expected = returns.rolling(60).corr(bench)
+    pd.testing.assert_frame_equal(rolling_corr(returns, bench, 60), expected, atol=1e-9)
@@ -0,0 +1,64 @@
+import pandas as pd
+from data_cache import FrameMemo, FrameProvider, PriceCache
+from price_store import PriceStore
+
+
+def test_memo_does_not_cover_future_dates(frames):
+    df = frames['S00000']
+    today = pd.Timestamp.today().normalize()
+    memo = FrameMemo()
+    memo.put('S00000', '2020-01-01', today + pd.Timedelta(days=30), df)
+    assert memo.entries['S00000']['end'] == today
+    assert memo.get('S00000', '2021-01-01', today) is not None
+    assert memo.get('S00000', '2021-01-01', today + pd.Timedelta(days=1)) is None
+
+
+def _cache(tmp_path, frames, max_bytes=2 * 1024 ** 3):
+    return PriceCache(PriceStore(str(tmp_path / 'store')), FrameProvider(frames), max_bytes)
+
+
+def _expected(frames, symbol, start, end):
+    df = frames[symbol]
+    return df[(df.index >= start) & (df.index < end)]
+
+
+def test_cache_downloads_only_gaps(tmp_path, frames):
+    cache = _cache(tmp_path, frames)
+    df = cache.get('S00000', '2023-06-01', '2024-01-01')
+    assert len(cache.provider.calls) == 1
+    pd.testing.assert_frame_equal(df, _expected(frames, 'S00000', '2023-06-01', '2024-01-01'), check_freq=False)
+
+    cache.get('S00000', '2023-07-01', '2023-12-01')
+    assert len(cache.provider.calls) == 1
+
+    df = cache.get('S00000', '2023-03-01', '2024-06-01')
+    gaps = [(s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')) for _, s, e in cache.provider.calls[1:]]
+    # 上次最后一根K线是 2023-12-29，覆盖区间只记到其次日
+    assert gaps == [('2023-03-01', '2023-06-01'), ('2023-12-30', '2024-06-01')]
+    pd.testing.assert_frame_equal(df, _expected(frames, 'S00000', '2023-03-01', '2024-06-01'), check_freq=False)
+
+    reopened = _cache(tmp_path, frames)
+    reopened.get('S00000', '2023-04-01', '2024-05-01')
+    assert reopened.provider.calls == []
+
+
+def test_cache_evicts_least_recently_used(tmp_path, frames):
+    cache = _cache(tmp_path, frames)
+    cache.get('S00000', '2023-01-01', '2025-01-01')
+    size = cache.coverage['S00000']['bytes']
+    cache.max_bytes = int(size * 2.5)
+    cache.get('S00001', '2023-01-01', '2025-01-01')
+    cache.get('S00000', '2023-01-01', '2025-01-01')
+    cache.get('S00002', '2023-01-01', '2025-01-01')
+    assert set(cache.coverage) == {'S00000', 'S00002'}
+    assert not cache.store.has('S00001')
+
+
+def test_cache_keeps_failed_gap_uncovered(tmp_path, frames):
+    cache = _cache(tmp_path, frames)
+    cache.get('S00000', '2023-06-01', '2024-01-01')
+    cache.provider.frames.pop('S00000')
+    df = cache.get('S00000', '2023-06-01', '2024-06-01')
+    assert df.index.max() < pd.Timestamp('2024-01-01')
+    assert cache.coverage['S00000']['end'] == '2023-12-30T00:00:00'
+    assert cache.gaps('S00000', '2023-06-01', '2024-06-01') == [(pd.Timestamp('2023-12-30'), pd.Timestamp('2024-06-01'))]
@@ -0,0 +1,48 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from downsample import LineDownsampler, lttb_indices, minmax_indices
+
+
+def _walk(n, seed=0):
+    return np.cumsum(np.random.default_rng(seed).normal(size=n))
+
+
+def test_minmax_keeps_bucket_extremes():
+    y = _walk(10007)
+    idx = minmax_indices(y, 100)
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0) and len(idx) <= 202
+    size = -(-len(y) // 100)
+    for start in range(0, len(y), size):
+        block = y[start:start + size]
+        assert start + block.argmin() in idx and start + block.argmax() in idx
+    np.testing.assert_array_equal(minmax_indices(y[:150], 100), np.arange(150))
+
+
+def test_lttb_picks_one_point_per_bucket():
+    y = _walk(5000)
+    idx = lttb_indices(y, 300)
+    assert len(idx) == 300
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+    np.testing.assert_array_equal(lttb_indices(y[:200], 300), np.arange(200))
+
+
+def test_line_resamples_visible_range():
+    y = _walk(100000)
+    x = np.arange(len(y), dtype='float64')
+    fig, ax = plt.subplots()
+    # 回调只持有弱引用，采样器需要保持存活
+    sampler = LineDownsampler(ax, max_buckets=100)
+    line = sampler.plot(x, y)
+    assert len(line.get_xdata()) <= 202
+    assert line.get_ydata().max() == y.max() and line.get_ydata().min() == y.min()
+
+    ax.set_xlim(1000, 2000)
+    xs = line.get_xdata()
+    assert xs[0] <= 1000 and xs[-1] >= 2000 and len(xs) <= 204
+    assert np.sum((xs >= 1000) & (xs <= 2000)) > 150
+    assert line.get_ydata().max() == y[1000:2001].max()
+    plt.close(fig)
@@ -0,0 +1,106 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from data_cache import FrameProvider, PriceCache
+from fetcher import fetch_one, fetch_frames, iter_frames, assemble
+from price_store import PriceStore
+
+
+class FlakyCache:
+    def __init__(self, frames, failures=0, empty=0, delay=0.0):
+        self.frames = frames
+        self.failures = failures
+        self.empty = empty
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, symbol, start, end):
+        with self._lock:
+            self.calls.append(symbol)
+            attempt = self.calls.count(symbol)
+        if self.delay:
+            time.sleep(self.delay)
+        if attempt <= self.failures:
+            raise ConnectionError('timeout')
+        if attempt <= self.failures + self.empty or symbol not in self.frames:
+            return pd.DataFrame()
+        return self.frames[symbol]
+
+
+class FailOnceProvider(FrameProvider):
+    def __init__(self, frames, fail_call):
+        super().__init__(frames)
+        self.fail_call = fail_call
+
+    def download(self, symbol, start, end):
+        df = super().download(symbol, start, end)
+        # 模拟 yfinance 出错时返回空表
+        return df.iloc[:0] if len(self.calls) == self.fail_call else df
+
+
+def _bars(frames, symbol, start, end):
+    df = frames[symbol]
+    return df[(df.index >= start) & (df.index < end)]
+
+
+def test_fetch_one_retry_recovers_through_price_cache(tmp_path, frames):
+    cache = PriceCache(PriceStore(str(tmp_path / 'store')), FailOnceProvider(frames, fail_call=1))
+    df = fetch_one(cache, 'S00000', '2023-03-01', '2024-01-01', retries=2, backoff=0)
+    assert len(cache.provider.calls) == 2
+    pd.testing.assert_frame_equal(df, _bars(frames, 'S00000', '2023-03-01', '2024-01-01'), check_freq=False)
+
+
+def test_failed_extension_is_downloaded_again(tmp_path, frames):
+    cache = PriceCache(PriceStore(str(tmp_path / 'store')), FailOnceProvider(frames, fail_call=2))
+    cache.get('S00000', '2023-03-01', '2023-06-01')
+    df = fetch_one(cache, 'S00000', '2023-03-01', '2024-01-01', retries=2, backoff=0)
+    assert df.index.max() < pd.Timestamp('2023-06-01')
+    df = fetch_one(cache, 'S00000', '2023-03-01', '2024-01-01', retries=2, backoff=0)
+    pd.testing.assert_frame_equal(df, _bars(frames, 'S00000', '2023-03-01', '2024-01-01'), check_freq=False)
+
+
+def test_fetch_one_retries_errors_and_empty_results(frames):
+    cache = FlakyCache(frames, failures=1, empty=1)
+    df = fetch_one(cache, 'S00000', None, None, retries=2, backoff=0)
+    assert cache.calls == ['S00000'] * 3
+    assert df is frames['S00000']
+
+
+def test_fetch_one_gives_up_after_retries(frames):
+    with pytest.raises(ConnectionError):
+        fetch_one(FlakyCache(frames, failures=5), 'S00000', None, None, retries=2, backoff=0)
+    assert fetch_one(FlakyCache(frames), 'MISSING', None, None, retries=1, backoff=0).empty
+
+
+def test_fetch_frames_reports_failures(frames):
+    symbols = ['S00000', 'S00001', 'MISSING']
+    got, failed = fetch_frames(FlakyCache(frames, failures=1), symbols, None, None, max_workers=3, backoff=0)
+    assert sorted(got) == ['S00000', 'S00001']
+    assert failed == ['MISSING']
+    panel = assemble(got, symbols)
+    assert list(panel['close'].columns) == ['S00000', 'S00001']
+
+
+def test_iter_frames_stops_on_cancel(frames):
+    cache = FlakyCache(frames, delay=0.2)
+    cancel = threading.Event()
+    symbols = [s for s in frames for _ in range(4)]
+    started = time.monotonic()
+    seen = []
+    for symbol, df in iter_frames(cache, symbols, None, None, max_workers=2, cancel=cancel, poll=0.05):
+        seen.append(symbol)
+        cancel.set()
+    assert len(seen) <= 2
+    assert time.monotonic() - started < 1.0
+    time.sleep(0.3)
+    assert len(cache.calls) <= 4
+
+
+def test_fetch_one_skips_when_cancelled(frames):
+    cancel = threading.Event()
+    cancel.set()
+    cache = FlakyCache(frames)
+    assert fetch_one(cache, 'S00000', None, None, cancel=cancel).empty
+    assert cache.calls == []
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from intraday import AGG, periods_per_year, stream_file
+
+
+@pytest.fixture
+def minute_csv(tmp_path):
+    rng = np.random.default_rng(3)
+    days = pd.bdate_range('2024-01-02', periods=5)
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(d + pd.Timedelta(hours=9, minutes=30), periods=390, freq='min').values for d in days]))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(index))))
+    df = pd.DataFrame({'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close,
+                       'Volume': rng.integers(100, 1000, len(index)).astype('float64')}, index=index)
+    path = tmp_path / 'minute.csv'
+    df.to_csv(path, index_label='Datetime')
+    return str(path), df
+
+
+@pytest.mark.parametrize('chunksize', [390, 777, 1000])
+def test_chunked_resample_matches_whole_file(minute_csv, chunksize):
+    path, df = minute_csv
+    whole = stream_file(path, '7min', chunksize=len(df) + 1)
+    chunked = stream_file(path, '7min', chunksize=chunksize)
+    pd.testing.assert_frame_equal(chunked, whole)
+
+    bars = df.astype('float32').resample('7min').agg(AGG)
+    assert whole.iloc[0]['bars'] == bars['Close'].notna().sum()
+
+
+def test_periods_per_year_daily_rule():
+    assert periods_per_year('1D') == 252
+    assert periods_per_year('5min') == 252 * 390 / 5
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from metrics import TRADING_DAYS, compute_metrics, drawdown
+
+
+def test_metrics_match_pandas(returns):
+    bench = returns.mean(axis=1)
+    m = compute_metrics(returns, bench)
+    n = len(returns)
+
+    total = (1 + returns).prod() - 1
+    ann = (1 + total) ** (TRADING_DAYS / n) - 1
+    vol = returns.std() * np.sqrt(TRADING_DAYS)
+    downside = returns.where(returns < 0).std() * np.sqrt(TRADING_DAYS)
+    wealth = (1 + returns).cumprod()
+    max_dd = (wealth / wealth.cummax().clip(lower=1) - 1).min()
+    var95 = returns.quantile(0.05)
+    cvar95 = returns.where(returns.le(var95)).mean()
+    beta = returns.apply(lambda c: c.cov(bench)) / bench.var()
+    bench_ann = (1 + bench).prod() ** (TRADING_DAYS / n) - 1
+
+    expected = pd.DataFrame({'total_ret': total, 'ann_ret': ann, 'ann_vol': vol, 'sharpe': ann / vol,
+                             'sortino': ann / downside, 'calmar': ann / max_dd.abs(), 'max_dd': max_dd,
+                             'var95': var95, 'cvar95': cvar95, 'beta': beta, 'alpha': ann - beta * bench_ann})
+    pd.testing.assert_frame_equal(m[expected.columns].astype('float64'), expected, rtol=1e-9)
+    dates = (wealth / wealth.cummax().clip(lower=1) - 1).idxmin().dt.strftime('%Y-%m-%d')
+    assert list(m['max_dd_date']) == list(dates)
+
+
+def test_drawdown_matches_cummax(returns):
+    close = 100 * (1 + returns).cumprod()
+    pd.testing.assert_frame_equal(drawdown(close), close / close.cummax() - 1)
+    c = close['S00000']
+    np.testing.assert_allclose(drawdown(c.to_numpy()), c / c.cummax() - 1)
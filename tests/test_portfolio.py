@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from portfolio import PortfolioModel, portfolio_returns, project_simplex, rebalance
+
+
+def test_project_simplex_sums_to_one_within_cap():
+    v = np.random.default_rng(5).normal(0, 2, (50, 8))
+    for cap in (1.0, 0.3, 0.125):
+        w = project_simplex(v, cap)
+        np.testing.assert_allclose(w.sum(axis=1), 1, atol=1e-9)
+        assert w.min() >= 0 and w.max() <= cap + 1e-12
+        # 投影的最优性条件：严格介于0和上限之间的分量与原向量的差为同一个常数
+        for vi, wi in zip(v, w):
+            inner = (wi > 1e-9) & (wi < cap - 1e-9)
+            if inner.sum() > 1:
+                assert np.ptp((vi - wi)[inner]) < 1e-9
+
+
+def test_project_simplex_hand_computed():
+    v = np.array([[0.5, 0.3, -1.0]])
+    np.testing.assert_allclose(project_simplex(v), [[0.6, 0.4, 0.0]])
+    np.testing.assert_allclose(project_simplex(v, cap=0.55), [[0.55, 0.45, 0.0]])
+
+
+def test_rebalance_turnover_and_cost_hand_computed():
+    index = pd.to_datetime(['2024-01-30', '2024-01-31', '2024-02-01', '2024-02-02'])
+    r = pd.DataFrame({'A': [0.1, 0.0, 0.0, 0.0], 'B': [0.0, 0.0, 0.1, 0.0]}, index=index)
+    result = rebalance(r, [[0.5, 0.5], [1.0, 0.0]], freq='M', cost_bps=10)
+    # 1月建仓换手1；A上涨后权重漂移到 0.55/1.05，2月初调回等权的换手为 0.05/1.05
+    drift = 0.05 / 1.05
+    np.testing.assert_allclose(result['turnover'], [[1, 1], [0, 0], [drift, 0], [0, 0]])
+    np.testing.assert_allclose(result['returns'], [[0.05 - 0.001, 0.1 - 0.001], [0, 0],
+                                                   [0.05 - drift * 0.001, 0], [0, 0]])
+
+
+def test_rebalance_redistributes_unlisted_weight():
+    index = pd.bdate_range('2024-01-01', periods=3)
+    r = pd.DataFrame({'A': [0.02, 0.01, 0.0], 'B': [np.nan, np.nan, 0.03]}, index=index)
+    result = rebalance(r, [0.5, 0.5], freq='D', cost_bps=0)
+    np.testing.assert_allclose(result['returns'][0], [0.02, 0.01, 0.015])
+    pd.testing.assert_frame_equal(portfolio_returns(r, [0.5, 0.5]), result['returns'])
+
+
+def test_solve_respects_max_weight(returns):
+    model = PortfolioModel(returns)
+    w = model.solve([0.1, 1.0, 100.0], max_weight=0.25)
+    np.testing.assert_allclose(w.sum(axis=1), 1, atol=1e-9)
+    assert w.min() >= 0 and w.max() <= 0.25 + 1e-12
+    frontier = model.frontier(n_points=10)
+    assert frontier['ann_vol'].is_monotonic_increasing
@@ -0,0 +1,11 @@
+import pandas as pd
+
+
+def test_merge_keeps_history_outside_new_range(store, frames):
+    df = frames['S00000']
+    update = df.iloc[-20:].copy()
+    update['Close'] *= 2
+    merged = store.merge('S00000', update)
+    assert len(merged) == len(df)
+    pd.testing.assert_frame_equal(store.read('S00000').iloc[:-20], df.iloc[:-20], check_freq=False)
+    assert (store.read('S00000', ['Close'])['Close'].iloc[-20:] == update['Close']).all()
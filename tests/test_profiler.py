@@ -0,0 +1,70 @@
+import json
+import threading
+import time
+import tracemalloc
+from profiler import NULL_PROFILER, Profiler
+
+
+def test_nested_spans_and_totals():
+    p = Profiler()
+    with p.span('报告', figures=2):
+        with p.span('渲染'):
+            time.sleep(0.02)
+        with p.span('渲染'):
+            time.sleep(0.01)
+    outer = next(s for s in p.spans if s['name'] == '报告')
+    assert outer['depth'] == 0 and outer['args'] == {'figures': 2}
+    assert [s['depth'] for s in p.spans if s['name'] == '渲染'] == [1, 1]
+    assert p.totals(1)['渲染'] >= 0.03
+    assert p.totals()['报告'] >= p.totals(1)['渲染']
+    assert p.summary().startswith('报告 ')
+
+
+def test_threads_keep_separate_stacks():
+    p = Profiler()
+
+    def work(name):
+        with p.span(name):
+            time.sleep(0.01)
+
+    with p.span('主线程'):
+        threads = [threading.Thread(target=work, args=(f'任务{i}',), name=f'worker-{i}') for i in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert all(s['depth'] == 0 for s in p.spans)
+    assert {s['thread'] for s in p.spans} == {'MainThread', 'worker-0', 'worker-1', 'worker-2'}
+
+
+def test_memory_peak_is_attributed_to_the_child_span():
+    p = Profiler(memory=True)
+    with p.span('外层'):
+        with p.span('分配'):
+            block = bytearray(8 * 2 ** 20)
+            del block
+    p.close()
+    spans = {s['name']: s for s in p.spans}
+    assert spans['分配']['peak_mb'] >= 8
+    assert spans['外层']['peak_mb'] >= spans['分配']['peak_mb']
+    assert not tracemalloc.is_tracing()
+    assert '峰值' in p.summary()
+
+
+def test_write_chrome_trace(tmp_path):
+    p = Profiler()
+    with p.span('导入', rows=10):
+        pass
+    path = p.write(str(tmp_path / 'profile.json'))
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    events = [e for e in data['traceEvents'] if e['ph'] == 'X']
+    assert [e['name'] for e in events] == ['导入'] and events[0]['args'] == {'rows': 10}
+    assert any(e['ph'] == 'M' and e['args']['name'] == 'MainThread' for e in data['traceEvents'])
+    assert data['otherData']['totals'].keys() == {'导入'}
+
+
+def test_disabled_profiler_records_nothing():
+    with NULL_PROFILER.span('任何阶段'):
+        pass
+    assert NULL_PROFILER.spans == []
@@ -0,0 +1,53 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from report import MANIFEST, write_report
+
+
+def _close(frames):
+    return pd.DataFrame({s: df['Close'] for s, df in frames.items() if s != 'BENCH'}).dropna(how='all')
+
+
+def _manifest(out):
+    with open(os.path.join(out, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_append_bar_recomputes_only_that_symbol(frames, tmp_path):
+    close = _close(frames)
+    out, fresh = tmp_path / 'out', tmp_path / 'fresh'
+    out.mkdir()
+    fresh.mkdir()
+    write_report(close, str(out))
+    assert len(_manifest(out)['recomputed']) == close.shape[1]
+
+    updated = close.copy()
+    day = close.index[-1] + pd.offsets.BDay()
+    updated.loc[day] = np.nan
+    updated.loc[day, 'S00001'] = close['S00001'].dropna().iloc[-1] * 1.01
+    write_report(updated, str(out))
+    assert _manifest(out)['recomputed'] == ['S00001']
+    assert _manifest(out)['backtested'] == ['S00001']
+
+    write_report(updated, str(fresh), force=True)
+    for name in ('图表详情汇总.txt', 'report_summary.json'):
+        assert (out / name).read_text(encoding='utf-8') == (fresh / name).read_text(encoding='utf-8')
+
+
+def test_strategy_change_keeps_close_figure(frames, tmp_path):
+    close = _close(frames)
+    write_report(close, str(tmp_path))
+    write_report(close, str(tmp_path), strategy='ma_cross')
+    assert 1 not in _manifest(tmp_path)['rebuilt']
+
+
+def test_style_change_reuses_cached_intermediates(frames, tmp_path):
+    close = _close(frames)
+    write_report(close, str(tmp_path))
+    assert _manifest(tmp_path)['computed'] == ['corr', 'frontier']
+    write_report(close, str(tmp_path), dpi=80)
+    manifest = _manifest(tmp_path)
+    assert sorted(manifest['rebuilt']) == list(range(1, 8))
+    assert manifest['backtested'] == []
+    assert manifest['computed'] == []
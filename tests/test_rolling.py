@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from metrics import TRADING_DAYS
+from rolling import (rolling_alpha, rolling_beta, rolling_drawdown, rolling_max, rolling_sharpe, rolling_sortino,
+                     window_sum)
+
+WINDOW = 60
+
+
+def test_window_sum_matches_pandas(returns):
+    r = returns.copy()
+    r.iloc[100:105, 0] = np.nan
+    pd.testing.assert_frame_equal(pd.DataFrame(window_sum(r, WINDOW), index=r.index, columns=r.columns),
+                                  r.rolling(WINDOW).sum(), atol=1e-12)
+
+
+def test_rolling_sharpe_sortino_match_pandas(returns):
+    roll = returns.rolling(WINDOW)
+    sharpe = roll.mean() / roll.std() * np.sqrt(TRADING_DAYS)
+    pd.testing.assert_frame_equal(rolling_sharpe(returns, WINDOW), sharpe, atol=1e-9)
+
+    r = returns.iloc[:200, :2]
+    downside = r.rolling(WINDOW).apply(lambda w: w[w < 0].std(ddof=1), raw=True)
+    sortino = r.rolling(WINDOW).mean() * TRADING_DAYS / (downside * np.sqrt(TRADING_DAYS))
+    pd.testing.assert_frame_equal(rolling_sortino(r, WINDOW), sortino, atol=1e-9)
+
+
+def test_rolling_beta_alpha_match_pandas(returns):
+    bench = returns.mean(axis=1)
+    roll = returns.rolling(WINDOW)
+    beta = roll.cov(bench).div(bench.rolling(WINDOW).var(), axis=0)
+    alpha = (roll.mean() - beta.mul(bench.rolling(WINDOW).mean(), axis=0)) * TRADING_DAYS
+    pd.testing.assert_frame_equal(rolling_beta(returns, bench, WINDOW), beta, atol=1e-9)
+    pd.testing.assert_frame_equal(rolling_alpha(returns, bench, WINDOW), alpha, atol=1e-9)
+
+
+def test_rolling_max_drawdown_match_pandas(returns):
+    close = 100 * (1 + returns).cumprod()
+    close.iloc[50:53, 1] = np.nan
+    for window in (1, 7, WINDOW, len(close) + 5):
+        peak = close.rolling(window, min_periods=1).max()
+        pd.testing.assert_frame_equal(rolling_max(close, window), peak)
+        pd.testing.assert_frame_equal(rolling_drawdown(close, window), close / peak - 1)
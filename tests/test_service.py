@@ -0,0 +1,94 @@
+import threading
+import pandas as pd
+import pytest
+from data_cache import PriceCache, FrameMemo, FrameProvider
+from price_store import PriceStore
+from service import AnalysisService, make_server
+from service_client import ServiceClient, encode_result, decode_result
+
+TICKERS = ['S00000', 'S00001', 'S00002']
+START, END = '2023-01-01', '2025-01-01'
+
+
+@pytest.fixture
+def service(tmp_path, frames):
+    return AnalysisService(PriceCache(PriceStore(str(tmp_path / 'store')), FrameProvider(frames)), FrameMemo())
+
+
+@pytest.fixture(params=['http', 'unix'])
+def client(request, service, tmp_path):
+    address = 'http://127.0.0.1:0' if request.param == 'http' else f'unix:{tmp_path}/service.sock'
+    server = make_server(service, address)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    if request.param == 'http':
+        address = f'http://127.0.0.1:{server.server_address[1]}'
+    yield ServiceClient(address, timeout=30)
+    server.shutdown()
+    server.server_close()
+
+
+def assert_same_result(a, b):
+    assert a.keys() == b.keys()
+    for key, value in a.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(b[key], value, check_freq=False)
+        elif isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(b[key], value, check_freq=False)
+        elif key == 'rolling':
+            for name, frame in value.items():
+                pd.testing.assert_frame_equal(b[key][name], frame, check_freq=False)
+        else:
+            assert b[key] == value or (value != value and b[key] != b[key]), key
+
+
+def test_encode_roundtrip(service):
+    data = service.analyze(TICKERS, 'BENCH', START, END, simulation=True, optimize=True)
+    assert_same_result(data, decode_result(encode_result(data)))
+
+
+def test_memo_probed_once_per_symbol(service):
+    frames, hits = service.frames(TICKERS, START, END)
+    assert sorted(frames) == TICKERS and hits == 0
+    assert (service.memo.hits, service.memo.misses) == (0, len(TICKERS))
+    frames, hits = service.frames(TICKERS, START, END)
+    assert hits == len(TICKERS)
+    assert (service.memo.hits, service.memo.misses) == (len(TICKERS), len(TICKERS))
+    assert service.health()['downloads'] == len(TICKERS)
+
+
+def test_client_matches_local(service, client):
+    local = service.analyze(TICKERS, 'BENCH', START, END, optimize=True)
+    remote = client.analyze(TICKERS, 'BENCH', START, END, optimize=True)
+    assert_same_result(local, remote)
+    assert client.health()['result_hits'] == 1
+
+    metrics = client.metrics(TICKERS, 'BENCH', START, END)
+    assert metrics['stock_cols'] == TICKERS
+    assert metrics['sim'] is None
+
+
+def test_client_reports_errors(client):
+    with pytest.raises(RuntimeError, match='股票数据获取失败'):
+        client.analyze(['NOPE'], 'BENCH', START, END)
+
+
+def test_concurrent_requests_are_coalesced(tmp_path, frames):
+    provider = FrameProvider(frames, latency=0.2)
+    service = AnalysisService(PriceCache(PriceStore(str(tmp_path / 'store')), provider), FrameMemo())
+    results = [None] * 4
+
+    def run(i):
+        results[i] = service.analyze(TICKERS, 'BENCH', START, END)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    health = service.health()
+    assert health['requests'] == 4
+    assert health['coalesced'] + health['result_hits'] == 3
+    assert sorted(s for s, _, _ in provider.calls) == sorted(TICKERS + ['BENCH'])
+    for data in results[1:]:
+        assert data['stats'] == results[0]['stats']
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from simulation import TICKER_BLOCK, bootstrap_paths, pack_returns, path_stats, simulate
+
+
+def _wide_returns(k=TICKER_BLOCK + 6, n=300):
+    rng = np.random.default_rng(3)
+    r = pd.DataFrame(rng.normal(3e-4, 0.02, (n, k)), columns=[f'S{i:05d}' for i in range(k)])
+    r.iloc[:120, 1] = np.nan
+    return r
+
+
+def test_same_seed_same_result_for_any_worker_count():
+    r = _wide_returns()
+    one = simulate(r, n_paths=2000, seed=11, workers=1)
+    two = simulate(r, n_paths=2000, seed=11, workers=2)
+    pd.testing.assert_frame_equal(one, two)
+    assert list(one.index) == list(r.columns)
+    assert not one.equals(simulate(r, n_paths=2000, seed=12, workers=1))
+
+
+def test_pack_returns_moves_history_to_top():
+    r = np.array([[np.nan, 1.0], [np.nan, 2.0], [3.0, 3.0], [4.0, 4.0]])
+    packed, n = pack_returns(r, block=3)
+    np.testing.assert_array_equal(n, [2, 4])
+    # 有效收益率移到顶部，其后接上开头的 block-1 天供循环取块
+    np.testing.assert_array_equal(packed[:4, 0], [3, 4, 3, 4])
+    np.testing.assert_array_equal(packed[:, 1], [1, 2, 3, 4, 1, 2])
+
+
+def test_bootstrap_draws_contiguous_blocks():
+    history = np.arange(50, dtype='float64')
+    packed, n = pack_returns(history, block=5)
+    paths = bootstrap_paths(np.random.default_rng(0), packed, n, 200, 12, block=5)[:, :, 0]
+    assert paths.shape == (12, 200)
+    for lo in (0, 5, 10):
+        block = paths[lo:lo + 5]
+        np.testing.assert_array_equal(np.diff(block, axis=0) % 50, 1)
+
+
+def test_path_stats_hand_computed():
+    r = np.array([[0.1, -0.1], [-0.2, 0.05], [0.05, 0.0]], dtype='float32')[:, :, None]
+    terminal, max_dd = path_stats(r)
+    np.testing.assert_allclose(terminal[:, 0], [1.1 * 0.8 * 1.05 - 1, 0.9 * 1.05 - 1], atol=1e-6)
+    np.testing.assert_allclose(max_dd[:, 0], [0.8 - 1, -0.1], atol=1e-6)
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+import pandas as pd
+from backtest import main
+from strategy import backtest, ma_cross, parse_params, run_strategy
+
+
+def test_backtest_hand_computed():
+    close = pd.DataFrame({'A': [10.0, 11.0, 12.1, 11.495]}, index=pd.bdate_range('2024-01-01', periods=4))
+    r = backtest(close, np.array([1.0, 1.0, 0.0, 0.0]), cost_bps=10)
+    # 信号次日生效：第2根K线开仓、第4根K线平仓，各扣一次单边10bp
+    np.testing.assert_allclose(r['turnover']['A'], [0, 1, 0, 1])
+    np.testing.assert_allclose(r['costs']['A'], [0, 0.001, 0, 0.001])
+    np.testing.assert_allclose(r['returns']['A'], [0.099, 0.1, -0.001])
+    np.testing.assert_allclose(r['equity']['A'], [1, 1.099, 1.2089, 1.2089 * 0.999])
+    assert list(r['returns'].index) == list(close.index[1:])
+
+
+def test_ma_cross_positions():
+    close = np.array([1.0, 2.0, 3.0, 2.0, 1.0])
+    np.testing.assert_array_equal(ma_cross(close, short=2, long=3)[:, 0], [0, 0, 1, 1, 0])
+
+
+def test_parse_params_keeps_integer_windows():
+    assert parse_params(['short=5', 'long=20', 'k=1.5']) == {'short': 5, 'long': 20, 'k': 1.5}
+
+
+def test_float_windows_without_cache(frames):
+    close = pd.DataFrame({s: df['Close'] for s, df in frames.items()})
+    a = run_strategy(close, 'ma_cross', short=5.0, long=20.0)['returns']
+    b = run_strategy(close, 'ma_cross', short=5, long=20)['returns']
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_cli_strategy_params(store, tmp_path):
+    universe = tmp_path / 'universe.txt'
+    universe.write_text('S00000, S00001, S00002, S00003\n', encoding='utf-8')
+    out = tmp_path / 'out'
+    main(['--universe', str(universe), '--store', store.root, '--csv-dir', str(tmp_path), '--out', str(out),
+          '--workers', '1', '--no-charts', '--strategy', 'ma_cross', '--param', 'short=5', '--param', 'long=20'])
+    result = pd.read_csv(os.path.join(out, 'metrics.csv'), index_col=0)
+    assert sorted(result.index) == ['S00000', 'S00001', 'S00002', 'S00003']
+    assert result['ann_vol'].notna().all()